@@ -26,6 +26,22 @@ def create_app(test_config=None):
     except OSError:
         pass
 
+    # Serve plotly.js as a cached static file, written by flask build-assets, rather than in every page with a chart
+    from student.flask_paralympics import plotly_js
+    plotly_js.init_app(app)
+
+    # Serve the hashed and compressed copies of the CSS and JavaScript files made by flask build-assets
+    from student.flask_paralympics import assets
+    assets.init_app(app)
+
+    # Load the prediction model once when the app starts, rather than for every prediction
+    from student.flask_paralympics import model_registry
+    model_registry.init_app(app)
+
+    # Calculate the forecast table for the upcoming games once when the app starts
+    from student.flask_paralympics import batch_predictions
+    batch_predictions.init_app(app)
+
     with app.app_context():
     # Register Blueprint
         from student.flask_paralympics.routes import main
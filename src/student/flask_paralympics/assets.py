@@ -0,0 +1,176 @@
+"""
+Build step and static file handler for the CSS and JavaScript files used by the templates.
+
+The static folder has every variant of the Bootstrap files, but the templates only use a few of them. The build step
+finds the files the templates use, copies each to a name that includes a hash of its contents, e.g.
+css/bootstrap-1a2b3c4d.css, and writes gzip (.gz) and brotli (.br) compressed copies next to it. A manifest maps the
+original names to the hashed names, so url_for('static', filename='css/bootstrap.css') in a template gives the hashed
+name without changing the template.
+
+Hashed files are served with the compressed copy the browser accepts and are cached for a year without being checked
+again: if a file changes, so does its name.
+
+The build step also writes plotly.js to the static folder, see plotly_js.py.
+
+Run the build step after changing the static files or templates, or after upgrading plotly:
+flask --app student.flask_paralympics build-assets
+
+`pip install brotli` is required for the .br files. Without it only the .gz files are written.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+from pathlib import Path
+
+import click
+from flask import current_app, request, send_from_directory
+
+from student.flask_paralympics.plotly_js import write_plotly_js
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Matches the names of static files that have a content hash in the name, e.g. plotly-3f2a9c1b.min.js
+FINGERPRINT_RE = re.compile(r"-[0-9a-f]{8}\.")
+
+# One year, the longest time browsers are asked to cache a fingerprinted file
+CACHE_MAX_AGE = 31536000
+
+# Name of the manifest in the static folder, {original name: hashed name}
+MANIFEST_NAME = "assets.json"
+
+# Matches url_for('static', filename='...') in the templates. Filenames given by a variable are not matched.
+STATIC_URL_RE = re.compile(r"""url_for\(\s*['"]static['"]\s*,\s*filename\s*=\s*['"]([^'"]+)['"]""")
+
+# Compressed copies in the order they are preferred: (Content-Encoding, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def find_static_files(template_folder):
+    """Return the sorted names of the static files referenced in the templates."""
+    filenames = set()
+    for template in Path(template_folder).rglob("*.html"):
+        filenames.update(STATIC_URL_RE.findall(template.read_text(encoding="utf-8")))
+    return sorted(filenames)
+
+
+def hashed_name(filename, content):
+    """Return the filename with the first 8 characters of the sha256 hash of the content before the first '.'"""
+    path = Path(filename)
+    stem, _, suffixes = path.name.partition(".")
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    return path.with_name(f"{stem}-{digest}.{suffixes}").as_posix()
+
+
+def compress(path, content):
+    """Write gzip and, if installed, brotli compressed copies of the content next to the path."""
+    # mtime=0 so that the same content always gives the same .gz file
+    Path(f"{path}.gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        Path(f"{path}.br").write_bytes(brotli.compress(content, quality=11))
+
+
+def remove_old_versions(static_folder, filename, keep):
+    """Delete hashed copies of the file from earlier builds, and their compressed copies."""
+    path = Path(static_folder).joinpath(filename)
+    stem, _, suffixes = path.name.partition(".")
+    for old in path.parent.glob(f"{stem}-????????.{suffixes}*"):
+        if FINGERPRINT_RE.search(old.name) and not old.name.startswith(Path(keep).name):
+            old.unlink()
+
+
+def build_assets(static_folder, template_folder, extra=()):
+    """
+    Copy the static files referenced in the templates to hashed names, compress them and write the manifest.
+
+    Parameters:
+        static_folder: str  Path of the app's static folder
+        template_folder: str  Path of the app's templates folder
+        extra: list of other static files to include, e.g. the plotly.js file. Files that already have a hash in their
+        name are compressed but not renamed.
+
+    Returns:
+        manifest: dict of {original name: hashed name}
+    """
+    static_folder = Path(static_folder)
+    manifest = {}
+    for filename in find_static_files(template_folder) + list(extra):
+        source = static_folder.joinpath(filename)
+        if not source.is_file():
+            print(f"Static file not found: {source}")
+            continue
+        content = source.read_bytes()
+        if FINGERPRINT_RE.search(source.name):
+            target = filename
+        else:
+            target = hashed_name(filename, content)
+            remove_old_versions(static_folder, filename, keep=target)
+            static_folder.joinpath(target).write_bytes(content)
+            manifest[filename] = target
+        compress(static_folder.joinpath(target), content)
+    static_folder.joinpath(MANIFEST_NAME).write_text(json.dumps(manifest, indent=2) + "\n")
+    return manifest
+
+
+def load_manifest(static_folder):
+    """Return the manifest written by build_assets, or an empty dict if the build step has not been run."""
+    path = Path(static_folder).joinpath(MANIFEST_NAME)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def send_static_file(filename):
+    """
+    Replacement for Flask's static route.
+
+    Hashed files are sent as the compressed copy that the browser accepts, if there is one, with headers that let the
+    browser cache them for a year. Other files are sent by Flask as normal.
+    """
+    if not FINGERPRINT_RE.search(filename):
+        return current_app.send_static_file(filename)
+
+    static_folder = Path(current_app.static_folder)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    for encoding, suffix in ENCODINGS:
+        if request.accept_encodings[encoding] and static_folder.joinpath(filename + suffix).is_file():
+            response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+            response.content_encoding = encoding
+            break
+    else:
+        response = current_app.send_static_file(filename)
+
+    # The response depends on the Accept-Encoding header, so shared caches must store each version separately
+    response.vary.add("Accept-Encoding")
+    # Fingerprinted static files never change, so the browser does not need to check for a new version
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+@click.command("build-assets")
+def build_assets_command():
+    """Write plotly.js, and hash and compress the static files used by the templates."""
+    extra = [write_plotly_js(current_app.static_folder)] if "PLOTLY_JS" in current_app.config else []
+    manifest = build_assets(current_app.static_folder, Path(current_app.root_path, current_app.template_folder), extra)
+    for filename, target in manifest.items():
+        click.echo(f"{filename} -> {target}")
+
+
+def init_app(app):
+    """Serve the hashed static files, make url_for use their names and add the build-assets command."""
+    manifest = load_manifest(app.static_folder)
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    app.view_functions["static"] = send_static_file
+    app.cli.add_command(build_assets_command)
@@ -0,0 +1,207 @@
+"""
+Predictions of the total medals for many teams and years with a single call to the model.
+
+make_prediction builds a DataFrame and calls model.predict for one team and year. The functions here build one
+DataFrame for all the pairs and call predict once, which is almost as quick for a thousand rows as for one.
+
+The model's OneHotEncoder raises an error if any team was not in the training data, which would fail the whole batch,
+so those rows are left out of the call to predict and given a prediction of None.
+
+A forecast table of every team the model knows for the upcoming games is calculated once for each version of the model
+(the hash of model.pkl, see model_registry), so it is recalculated the first time it is asked for after the model is
+retrained.
+
+The routes that use these functions are in routes.py:
+    POST /predict/batch with a JSON body of either {"pairs": [[year, team], ...]} or {"years": [...], "teams": [...]}
+        for every combination of the years and teams
+    GET /predict/forecast for the forecast table
+Both return JSON, or CSV if the URL ends with ?format=csv. The rows are streamed rather than built into one string.
+Errors are returned as JSON {"error": message}, with status 400 for a bad request and 503 if the model cannot be loaded.
+
+init_app calculates the forecast table when the app starts, so the first request does not wait for it.
+"""
+import csv
+import datetime
+import io
+import itertools
+import json
+import threading
+
+import pandas as pd
+from flask import Response, jsonify, request, stream_with_context
+
+from student.flask_paralympics.compact_model import CompactModel
+from student.flask_paralympics.model_registry import model_path, model_registry
+
+# Number of upcoming games in the forecast table. The summer and winter games alternate, one every two years.
+FORECAST_GAMES = 5
+
+# Number of rows written to the CSV or JSON response at a time
+STREAM_CHUNK_ROWS = 500
+
+
+def known_teams(model):
+    """Return the names of the teams the model was trained on, from the categories of its OneHotEncoder."""
+    if isinstance(model, CompactModel):
+        return list(model.teams)
+    return list(model.named_steps["preprocessor"].named_transformers_["team"].categories_[0])
+
+
+def predict_pairs(pairs, path=None):
+    """
+    Predict the total medals for each (year, team) pair with a single call to the model.
+
+    Parameters:
+        pairs: list of (year, team)
+        path: str  Path of the model file, see model_registry.model_path() for the default
+
+    Returns:
+        df: DataFrame with Year, Team and Prediction columns in the same order as the pairs. Prediction is an int of
+        at least 0, or None if the team is not known by the model.
+    """
+    path = path or model_path()
+    df = pd.DataFrame(list(pairs), columns=["Year", "Team"])
+    known = df["Team"].isin(known_teams(model_registry.get(path)))
+    predictions = pd.Series(None, index=df.index, dtype=object)
+    if known.any():
+        values = model_registry.predict(path, df.loc[known, ["Year", "Team"]])
+        # predict() returns floats so convert to int and handle negative predictions, as make_prediction does
+        predictions[known] = [max(0, int(value)) for value in values]
+    return df.assign(Prediction=predictions)
+
+
+def pairs_from_body(body):
+    """
+    Return the (year, team) pairs in the JSON body of a batch prediction request.
+
+    Parameters:
+        body: the JSON body, either {"pairs": [[year, team], ...]} or {"years": [...], "teams": [...]}
+
+    Returns:
+        pairs: list of (year, team)
+
+    Raises:
+        ValueError: if the body is not in one of those forms
+    """
+    if not isinstance(body, dict):
+        raise ValueError('The JSON body must be an object with "pairs", or "years" and "teams"')
+    if "pairs" in body:
+        pairs = body["pairs"]
+        if not isinstance(pairs, list) or not all(isinstance(pair, list) and len(pair) == 2 for pair in pairs):
+            raise ValueError('"pairs" must be a list of [year, team] lists')
+        return [tuple(pair) for pair in pairs]
+    if "years" in body and "teams" in body:
+        if not isinstance(body["years"], list) or not isinstance(body["teams"], list):
+            raise ValueError('"years" and "teams" must be lists')
+        return list(itertools.product(body["years"], body["teams"]))
+    raise ValueError('The JSON body must have "pairs", or "years" and "teams"')
+
+
+def predict_grid(years, teams, path=None):
+    """Predict the total medals for every combination of the years and teams, see predict_pairs."""
+    return predict_pairs(itertools.product(years, teams), path)
+
+
+def upcoming_years(games=FORECAST_GAMES, today=None):
+    """Return the years of the next games, starting with this year's if it is a games year (an even year)."""
+    year = (today or datetime.date.today()).year
+    first = year + year % 2
+    return list(range(first, first + 2 * games, 2))
+
+
+# The forecast table for each model file, {path: (model hash, DataFrame)}
+_forecasts = {}
+_forecasts_lock = threading.Lock()
+
+
+def forecast_table(path=None):
+    """
+    Return the predictions for every known team for the upcoming games, calculated once for each version of the model.
+
+    Parameters:
+        path: str  Path of the model file, see model_registry.model_path() for the default
+
+    Returns:
+        df: DataFrame with Year, Team and Prediction columns, sorted by year and team
+    """
+    path = str(path or model_path())
+    model = model_registry.get(path)
+    model_hash = model_registry.version(path)
+    entry = _forecasts.get(path)
+    if entry is None or entry[0] != model_hash:
+        with _forecasts_lock:
+            entry = _forecasts.get(path)
+            if entry is None or entry[0] != model_hash:
+                entry = (model_hash, predict_grid(upcoming_years(), known_teams(model), path))
+                _forecasts[path] = entry
+    return entry[1]
+
+
+def row_chunks(df):
+    """Yield the rows of the DataFrame as lists of tuples of Python values, STREAM_CHUNK_ROWS rows at a time."""
+    for start in range(0, len(df), STREAM_CHUNK_ROWS):
+        chunk = df.iloc[start:start + STREAM_CHUNK_ROWS].astype(object)
+        yield list(chunk.where(chunk.notna(), None).itertuples(index=False, name=None))
+
+
+def stream_rows(df, fmt):
+    """
+    Yield the rows of the DataFrame as CSV with a header row, or as a JSON list of objects, a chunk at a time.
+
+    Parameters:
+        df: DataFrame
+        fmt: str  csv or json
+
+    Returns:
+        generator of str
+    """
+    columns = list(df.columns)
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for chunk in row_chunks(df):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        yield "["
+        separator = ""
+        for chunk in row_chunks(df):
+            yield separator + ",".join(json.dumps(dict(zip(columns, row)), default=int) for row in chunk)
+            separator = ","
+        yield "]"
+
+
+def json_error(message, status):
+    """Return a JSON response of {"error": message} with the HTTP status code."""
+    return jsonify(error=message), status
+
+
+def model_load_error():
+    """Return a 503 JSON error response if the model cannot be loaded, or None if it loads."""
+    try:
+        model_registry.get(model_path())
+    except Exception as e:
+        return json_error(f"The model could not be loaded: {e}", 503)
+    return None
+
+
+def rows_response(df):
+    """Return a streamed response of the rows in the format given by ?format=, json by default."""
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "csv"):
+        return json_error('format must be "json" or "csv"', 400)
+    mimetype = "text/csv" if fmt == "csv" else "application/json"
+    return Response(stream_with_context(stream_rows(df, fmt)), mimetype=mimetype)
+
+
+def init_app(app):
+    """Calculate the forecast table when the app starts, if the model has loaded."""
+    with app.app_context():
+        try:
+            forecast_table()
+        except Exception as e:
+            print(f"The forecast table could not be calculated. Error: {e}")
@@ -0,0 +1,66 @@
+"""
+Predicts the total medals with the coefficients of the regression model, using only NumPy.
+
+The model saved by student.placeholder.create_ml_model is a scikit-learn Pipeline of a OneHotEncoder of the team and a
+LinearRegression. Its prediction is the intercept, plus the year multiplied by the year coefficient, plus the
+coefficient of the team. export_compact_model in create_ml_model saves these values to a .npz file, e.g. model.npz,
+which this module loads without importing scikit-learn. Importing scikit-learn takes seconds and tens of MB of memory
+in each web worker, whereas the .npz file is about 20 KB.
+
+The .npz file has the arrays:
+    intercept: the LinearRegression intercept
+    year_coef: the coefficient of the Year
+    teams: the team names, sorted as in the OneHotEncoder categories
+    team_coefs: the coefficient of each team, in the same order as teams
+
+To use it in the app, set MODEL_PATH in the config to the path of the .npz file. The model registry then loads it with
+load_compact_model rather than joblib.load.
+"""
+import numpy as np
+
+
+class CompactModel:
+    """
+    The regression model as NumPy arrays, with a predict method that takes the same DataFrame as the Pipeline.
+
+    Attributes:
+        intercept (float): The intercept
+        year_coef (float): The coefficient of the Year
+        teams (numpy array of str): The sorted team names
+        team_coefs (numpy array of float): The coefficient of each team
+    """
+
+    def __init__(self, intercept, year_coef, teams, team_coefs):
+        self.intercept = float(intercept)
+        self.year_coef = float(year_coef)
+        self.teams = np.asarray(teams)
+        self.team_coefs = np.asarray(team_coefs, dtype=np.float64)
+
+    def predict(self, input_data):
+        """
+        Predict the total medals for each row.
+
+        Parameters:
+            input_data: DataFrame with Year and Team columns
+
+        Returns:
+            predictions: numpy array of float
+
+        Raises:
+            ValueError: if a team is not in the model, as the Pipeline's OneHotEncoder does
+        """
+        years = np.asarray(input_data["Year"], dtype=np.float64)
+        teams = np.asarray(input_data["Team"], dtype=str)
+        # teams is sorted, so searchsorted finds the position of each team, which is checked to be an exact match
+        index = np.searchsorted(self.teams, teams)
+        index = np.minimum(index, len(self.teams) - 1)
+        unknown = self.teams[index] != teams
+        if unknown.any():
+            raise ValueError(f"Found unknown categories {sorted(set(teams[unknown].tolist()))} in column Team")
+        return self.intercept + years * self.year_coef + self.team_coefs[index]
+
+
+def load_compact_model(path):
+    """Return a CompactModel loaded from a .npz file written by create_ml_model.export_compact_model."""
+    with np.load(path, allow_pickle=False) as arrays:
+        return CompactModel(arrays["intercept"], arrays["year_coef"], arrays["teams"], arrays["team_coefs"])
@@ -0,0 +1,175 @@
+"""
+Loads the machine learning models used by the /predict page once per process, rather than on every request.
+
+Unpickling the model with joblib.load, and the import of scikit-learn that it causes, takes far longer than the
+prediction itself. The registry keeps each loaded model in memory, keyed on the path of its file, and loads it again
+only if the contents of the file change, see tutor.data.versioned_file. A retrained model.pkl is used without
+restarting the app.
+
+init_app loads the model when the app starts, so the first request does not wait for it. The /model-stats route in
+routes.py returns the time taken to load each model and the number and time of the predictions made with it.
+
+`pip install scikit-learn` is required to load model.pkl. Without it the app still starts, but predictions return an
+error message. Set MODEL_PATH in the config to a model.npz file to make predictions without scikit-learn, see
+compact_model.py.
+"""
+import os
+import threading
+import time
+from importlib import resources
+
+import pandas as pd
+from flask import current_app, has_app_context
+
+from student.flask_paralympics.compact_model import load_compact_model
+from tutor.data.versioned_file import VersionedFile
+
+# The model saved by student.placeholder.create_ml_model, used if MODEL_PATH is not in the app config
+DEFAULT_MODEL_PATH = resources.files("student.data").joinpath("model.pkl")
+
+
+def load_model(path):
+    """Load a .npz file with compact_model, which does not need scikit-learn, or any other file with joblib."""
+    if path.endswith(".npz"):
+        return load_compact_model(path)
+    # Imported here as scikit-learn is optional and slow to import, it is imported when the model loads
+    import joblib
+
+    return joblib.load(path)
+
+
+class ModelRegistry:
+    """
+    Thread-safe store of the models loaded in this process.
+
+    Attributes:
+        models (dict): {path: VersionedFile of the model loaded from the file}
+    """
+
+    def __init__(self):
+        self.models = {}
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _model_metrics(self, path):
+        """Return the metrics dictionary for a model, creating it if needed. Call with the lock held."""
+        if path not in self._metrics:
+            self._metrics[path] = {
+                "loads": 0,
+                "load_seconds_last": 0.0,
+                "load_seconds_total": 0.0,
+                "predictions": 0,
+                "rows_predicted": 0,
+                "predict_seconds_total": 0.0,
+                "predict_seconds_max": 0.0,
+            }
+        return self._metrics[path]
+
+    def _load(self, path):
+        """Load a model and record how long it took."""
+        start = time.perf_counter()
+        model = load_model(path)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            metrics = self._model_metrics(path)
+            metrics["loads"] += 1
+            metrics["load_seconds_last"] = seconds
+            metrics["load_seconds_total"] += seconds
+        return model
+
+    def _versioned_file(self, path):
+        """Return the VersionedFile of a model file, creating it if needed."""
+        versioned_file = self.models.get(path)
+        if versioned_file is None:
+            with self._lock:
+                versioned_file = self.models.setdefault(path, VersionedFile(path, self._load))
+        return versioned_file
+
+    def get(self, path):
+        """
+        Return the model saved in a file, loading it if it has not been loaded or the file has changed.
+
+        Parameters:
+            path: str or Path  Path of the .pkl file saved with joblib.dump, or the .npz file
+
+        Returns:
+            model: the unpickled model, e.g. a scikit-learn Pipeline
+        """
+        return self._versioned_file(str(path)).get()
+
+    def version(self, path):
+        """Return the hash of the model file the model was last loaded from, or None if it has not been loaded."""
+        versioned_file = self.models.get(str(path))
+        return versioned_file.version if versioned_file is not None else None
+
+    def predict(self, path, input_data):
+        """
+        Return the predictions of a model for the rows of a DataFrame, and record how long they took.
+
+        Parameters:
+            path: str or Path  Path of the .pkl file
+            input_data: DataFrame with the columns the model was trained on
+
+        Returns:
+            predictions: numpy array with a prediction for each row
+        """
+        model = self.get(path)
+        start = time.perf_counter()
+        predictions = model.predict(input_data)
+        seconds = time.perf_counter() - start
+        with self._lock:
+            metrics = self._model_metrics(str(path))
+            metrics["predictions"] += 1
+            metrics["rows_predicted"] += len(input_data)
+            metrics["predict_seconds_total"] += seconds
+            metrics["predict_seconds_max"] = max(metrics["predict_seconds_max"], seconds)
+        return predictions
+
+    def stats(self):
+        """Return a dictionary of {model file name: load and prediction metrics} for the models used."""
+        with self._lock:
+            stats = {}
+            for path, metrics in self._metrics.items():
+                stats[os.path.basename(path)] = dict(metrics, hash=self.version(path))
+            return stats
+
+
+model_registry = ModelRegistry()
+
+
+def model_path():
+    """Return the path of the model file, MODEL_PATH from the config of the current app if it is set."""
+    if has_app_context():
+        return current_app.config.get("MODEL_PATH", DEFAULT_MODEL_PATH)
+    return DEFAULT_MODEL_PATH
+
+
+def make_prediction(year, team, path=None):
+    """Takes the year and team name and predicts how many total medals will be won
+
+    Parameters:
+    year (int): The year of the prediction
+    team (str): The name of the team
+    path (str): Path of the model file, see model_path() for the default
+
+    Returns:
+    prediction (str or int): int of the prediction result, or string if error
+    """
+    # The predict() method fails if not in DataFrame format
+    input_data = pd.DataFrame({'Year': [year], 'Team': [team]})
+    try:
+        prediction = model_registry.predict(path or model_path(), input_data)
+        # predict() returns a float so convert to int and handle negative predictions
+        return max(0, int(prediction[0]))
+    except Exception as e:
+        return f"Error making prediction: {e}"
+
+
+def init_app(app):
+    """Load the model when the app starts."""
+    path = app.config.get("MODEL_PATH", DEFAULT_MODEL_PATH)
+    try:
+        model_registry.get(path)
+    except Exception as e:
+        # The app can run without the model, make_prediction returns the error when it is used
+        print(f"The model {path} could not be loaded. Error: {e}")
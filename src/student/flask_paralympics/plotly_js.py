@@ -0,0 +1,67 @@
+"""
+Serves the plotly.js library as a static file so that it is not included in every page that has a chart.
+
+The file name includes a hash of its contents, e.g. js/plotly-3f2a9c1b.min.js, so browsers can be told to cache it
+for a year: if the library changes, so does the name. The caching headers are set by assets.py. The file is written to
+the static folder by the build step, with the other static files:
+flask --app student.flask_paralympics build-assets
+
+Only the templates that have a chart load it, in the scripts block of base.html:
+{% block scripts %}
+    <script src="{{ url_for('static', filename=plotly_js) }}"></script>
+{% endblock %}
+
+The chart functions then use fig.to_html(include_plotlyjs=False) to return only the chart.
+"""
+import hashlib
+from pathlib import Path
+
+from plotly.offline import get_plotlyjs
+
+
+def plotly_js_filename(js=None):
+    """
+    Return the name of the plotly.js file, with a hash of the contents in the file name.
+
+    Parameters:
+        js: bytes  The plotly.js library, read from the plotly package if not given
+
+    Returns:
+        filename: str  Path of the file relative to the static folder, e.g. js/plotly-3f2a9c1b.min.js
+    """
+    if js is None:
+        js = get_plotlyjs().encode("utf-8")
+    return f"js/plotly-{hashlib.sha256(js).hexdigest()[:8]}.min.js"
+
+
+def write_plotly_js(static_folder):
+    """
+    Write plotly.js to the js folder of the static folder, with a hash of the contents in the file name.
+
+    The file is only written if it does not already exist.
+
+    Parameters:
+        static_folder: str  Path of the app's static folder
+
+    Returns:
+        filename: str  Path of the file relative to the static folder, e.g. js/plotly-3f2a9c1b.min.js
+    """
+    js = get_plotlyjs().encode("utf-8")
+    filename = plotly_js_filename(js)
+    path = Path(static_folder).joinpath(filename)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(js)
+    return filename
+
+
+def init_app(app):
+    """Make the name of the plotly.js file available to templates. The file is written by flask build-assets."""
+    filename = plotly_js_filename()
+    app.config["PLOTLY_JS"] = filename
+    if not Path(app.static_folder).joinpath(filename).exists():
+        print(f"{filename} is not in the static folder, run: flask --app {app.import_name} build-assets")
+
+    @app.context_processor
+    def plotly_js_context():
+        return {"plotly_js": filename}
@@ -1,6 +1,10 @@
 """ This is an example of a minimal Flask application."""
 # Import the Flask class from the Flask library
-from flask import render_template, Blueprint, request
+from flask import render_template, Blueprint, request, jsonify
+
+from student.flask_paralympics.batch_predictions import (forecast_table, json_error, model_load_error, pairs_from_body,
+                                                         predict_pairs, rows_response)
+from student.flask_paralympics.model_registry import model_registry
 
 main = Blueprint('main', __name__)
 
@@ -13,3 +17,35 @@ def login():
     if request.method == 'POST':
         return "POST request received. User logged in!"
     return "This is the login page. Send a POST request to log in."
+
+
+@main.route('/model-stats')
+def model_stats():
+    """Return the time taken to load each model and the number and time of the predictions made with it."""
+    return jsonify(model_registry.stats())
+
+
+@main.route('/predict/batch', methods=['POST'])
+def batch_prediction():
+    """Return the predictions for the pairs, or the years and teams, in the JSON body of the request."""
+    try:
+        pairs = pairs_from_body(request.get_json(silent=True))
+    except ValueError as e:
+        return json_error(str(e), 400)
+    error = model_load_error()
+    if error:
+        return error
+    try:
+        df = predict_pairs(pairs)
+    except (ValueError, TypeError) as e:
+        return json_error(f"Error making predictions: {e}", 400)
+    return rows_response(df)
+
+
+@main.route('/predict/forecast')
+def forecast():
+    """Return the predictions for every team the model knows for the upcoming games."""
+    error = model_load_error()
+    if error:
+        return error
+    return rows_response(forecast_table())
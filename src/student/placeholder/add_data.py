@@ -2,13 +2,18 @@
 Code from COMP0035
 Contains functions to add data to the paralympics database.
 Uses the SQLAlchemy object, db.
+
+add_all_data adds one ORM object at a time. add_all_data_bulk inserts each table with a single insert() of a list of
+dictionaries and commits once per table, which is much quicker for larger data sets.
 """
-from importlib import resources
+import sqlite3
 
-import pandas as pd
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from sqlalchemy.exc import SQLAlchemyError
 
+from student.placeholder.add_data_sql3 import host_country_codes, location_key
+from tutor.data.columnar import read_sheet, read_sheets
+from tutor.data.event_summary import rebuild_event_summary
 from tutor.flask_para_t import db
 from tutor.flask_para_t.models import Country, Disability, DisabilityEvent, Event, Host, HostEvent, MedalResult, \
     Participants
@@ -64,32 +69,20 @@ def add_event_data(df):
         db.session.rollback()
 
 
-def add_host_data(df_events):
-    """Add host data database."""
+def add_host_data(df_events, df_npc=None):
+    """Add host data database.
+
+    df_npc is the npc_codes data used to find the country codes, it is read from the data file if not given.
+    """
 
     try:
-        # Extract unique host name and country pairs
-        # Initialize an empty DataFrame with the columns needed
-        host_country_df = pd.DataFrame(columns=['host', 'country'])
-        # Iterate over each row in the events DataFrame and split each column into multiple values where there is ','
-        for index, row in df_events.iterrows():
-            hosts = row['host'].split(',')
-            countries = row['country'].split(',')
-            # Create pairs of each host with each country and append to the DataFrame
-            for host, country in zip(hosts, countries):
-                new_row = pd.DataFrame({'host': [host.strip()], 'country': [country.strip()]})
-                host_country_df = pd.concat([host_country_df, new_row], ignore_index=True)
-        # Remove duplicate hosts from the dataframe
-        host_country_df = host_country_df.drop_duplicates(subset=['host', 'country'])
-
-        # Iterate over the dataframe, add the host and country to the host table
-        for index, row in host_country_df.iterrows():
-            # Get the country code from the country table
-            country_name = row['country']
-            country = Country.query.filter_by(name=country_name).first()
-            if country:
-                new_host = Host(country_code=country.code, host=row['host'])
-                db.session.add(new_host)
+        if df_npc is None:
+            df_npc = read_sheet('npc_codes')
+        # Find the unique host and country pairs and the country codes
+        host_countries = host_country_codes(df_events, df_npc)
+        # Add the host and country code to the host table
+        for host, code in zip(host_countries['host'], host_countries['code']):
+            db.session.add(Host(country_code=code, host=host))
         # Commit the changes
         db.session.commit()
 
@@ -169,45 +162,71 @@ def add_disabilities_data(df):
 def add_medal_result_data(df):
     """Add MedalResult data to the paralympics database."""
     try:
-        # Iterate each result row, get the event_id and code and insert into the MedalResult table
+        # Find the event ids for each year and host. This needs the host and host_event data to have been added.
+        event_ids = medal_event_id_map()
+        # Iterate each result row, get the event and insert the result into the MedalResult table
         for index, row in df.iterrows():
-            # Find the event id for the event. This matches based on the year and host name.
-            query = db.select(Event).join(Event.host_events).join(HostEvent.host).where(Event.year == row['Year'],
-                                                                                        Host.host == row['Location'])
-            event = db.session.execute(query).scalar_one_or_none()
-            if event:
-                # Insert the medal results
-                event.medal_results.append(MedalResult(
-                    country_code=row['NPC'],
-                    rank=row['Rank'],
-                    gold=row['Gold'],
-                    silver=row['Silver'],
-                    bronze=row['Bronze'],
-                    total=row['Total']
-                ))
-                db.session.commit()
+            event_id = event_ids.get((row['Year'], location_key(row['Location'])))
+            if event_id is None:
+                print(f'No event found for the medal results for {row["Location"]} {row["Year"]}')
+                continue
+            # Insert the medal results
+            event = db.session.get(Event, event_id)
+            event.medal_results.append(MedalResult(
+                country_code=row['NPC'],
+                rank=row['Rank'],
+                gold=row['Gold'],
+                silver=row['Silver'],
+                bronze=row['Bronze'],
+                total=row['Total']
+            ))
+            db.session.commit()
 
     except SQLAlchemyError as e:
         print(f'An error occurred adding MedalResult data. Error: {e}')
         db.session.rollback()
 
 
+def medal_event_id_map():
+    """Return {(year, location_key(host)): event_id} for finding the event of each medal result.
+
+    The medal standings give the year and location rather than the event type, so the location is matched to the
+    event's hosts. The names are compared with location_key, as the sqlite3 loaders do, as the spelling is not always
+    the same, e.g. 'Tignes Albertville' and 'Tignes-Albertville'.
+    """
+    query = db.select(Event.year, Host.host, Event.event_id).select_from(HostEvent).join(HostEvent.event).join(
+        HostEvent.host)
+    return {(year, location_key(host)): event_id for year, host, event_id in db.session.execute(query)}
+
+
+def add_event_summary_data():
+    """Rebuild the event_summary table from the event, participants, host_event and host data."""
+    try:
+        # rebuild_event_summary uses a sqlite3 cursor, which is taken from the session's connection so that the
+        # rebuild is committed with the session
+        cursor = db.session.connection().connection.cursor()
+        rebuild_event_summary(cursor)
+        db.session.commit()
+    except (SQLAlchemyError, sqlite3.Error) as e:
+        print(f'An error occurred adding event_summary data. Error: {e}')
+        db.session.rollback()
+
+
 def add_all_data():
     """Adds all the data.
     """
-    # Specifies the path to the data file
-    data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
-
     # Read data and create pandas dataframes
-    events_df = pd.read_excel(data_path, sheet_name='events')
-    medals_df = pd.read_excel(data_path, sheet_name='medal_standings')
-    npc_df = pd.read_excel(data_path, sheet_name='npc_codes')
+    # Uses the Arrow files if they have been created with `python -m tutor.data.columnar`, otherwise paralympics.xlsx
+    sheets = read_sheets(['events', 'medal_standings', 'npc_codes'])
+    events_df = sheets['events']
+    medals_df = sheets['medal_standings']
+    npc_df = sheets['npc_codes']
 
     # List of tables and corresponding data addition functions and dataframes
     tables_and_functions = [
         (Country, add_country_data, npc_df),
         (Event, add_event_data, events_df),
-        (Host, add_host_data, events_df),
+        (Host, lambda df: add_host_data(df, npc_df), events_df),
         (HostEvent, add_host_event_data, events_df),
         (Disability, add_disabilities_data, events_df),
         (MedalResult, add_medal_result_data, medals_df)
@@ -218,3 +237,177 @@ def add_all_data():
         count_query = db.select(func.count()).select_from(table)
         if db.session.execute(count_query).scalar() == 0:
             add_data_function(data)
+
+    # The summary is always rebuilt as it is quick, and any of the tables it is made from may have been added to
+    add_event_summary_data()
+
+
+# Bulk loading
+# The functions above add one ORM object at a time and run a query for each row to find the ids it needs. The
+# functions below insert each table with a single Core insert() of a list of dictionaries, load the ids they need with
+# one query per table and commit once per table.
+
+def to_mappings(df, columns):
+    """
+    Return the rows of the dataframe as a list of dictionaries for insert(), with missing values as None.
+
+    Parameters:
+        df: DataFrame
+        columns: dict of {dataframe column: model attribute}
+
+    Returns:
+        rows: list of dicts of {model attribute: value}
+    """
+    values = df[list(columns)].astype(object)
+    values = values.where(values.notna(), None).rename(columns=columns)
+    return values.to_dict('records')
+
+
+def event_id_map():
+    """Return a dictionary of {(year, type): event_id} for the events in the database."""
+    query = db.select(Event.event_id, Event.year, Event.type).order_by(Event.event_id)
+    event_ids = {}
+    for event_id, year, event_type in db.session.execute(query):
+        event_ids.setdefault((year, event_type), event_id)
+    return event_ids
+
+
+def host_id_map():
+    """Return a dictionary of {host name: host_id} for the hosts in the database."""
+    query = db.select(Host.host_id, Host.host).order_by(Host.host_id)
+    host_ids = {}
+    for host_id, host in db.session.execute(query):
+        host_ids.setdefault(host, host_id)
+    return host_ids
+
+
+def bulk_add_country_data(df):
+    """Add the country data with a single insert."""
+    columns = {'code': 'code', 'name': 'name', 'region': 'region', 'sub_region': 'sub_region',
+               'member_type': 'member_type', 'notes': 'notes'}
+    try:
+        db.session.execute(insert(Country), to_mappings(df, columns))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        print(f'An error occurred adding country data to the paralympics database. Error: {e}')
+        db.session.rollback()
+
+
+def bulk_add_event_data(df):
+    """Add the event data, then the participant data using the new event ids."""
+    df = df.assign(start=df['start'].dt.strftime('%d/%m/%Y'), end=df['end'].dt.strftime('%d/%m/%Y'))
+    columns = {'type': 'type', 'year': 'year', 'start': 'start', 'end': 'end', 'countries': 'countries',
+               'events': 'events', 'sports': 'sports', 'highlights': 'highlights', 'url': 'url'}
+    try:
+        db.session.execute(insert(Event), to_mappings(df, columns))
+        db.session.commit()
+
+        event_ids = event_id_map()
+        participants = to_mappings(df, {'year': 'year', 'type': 'type', 'participants_m': 'participants_m',
+                                        'participants_f': 'participants_f', 'participants': 'participants'})
+        for row in participants:
+            row['event_id'] = event_ids[(row.pop('year'), row.pop('type'))]
+        db.session.execute(insert(Participants), participants)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        print(f'An error occurred adding event data to the paralympics database. Error: {e}')
+        db.session.rollback()
+
+
+def bulk_add_host_data(df_events, df_npc):
+    """Add the host data with a single insert."""
+    host_countries = host_country_codes(df_events, df_npc)
+    try:
+        db.session.execute(insert(Host), to_mappings(host_countries, {'host': 'host', 'code': 'country_code'}))
+        db.session.commit()
+    except SQLAlchemyError as e:
+        print(f'An error occurred adding host data to the paralympics database. Error: {e}')
+        db.session.rollback()
+
+
+def bulk_add_host_event_data(df):
+    """Add the HostEvent data with a single insert, using the event and host ids loaded from the database."""
+    event_ids = event_id_map()
+    host_ids = host_id_map()
+    rows = []
+    for year, event_type, hosts in zip(df['year'], df['type'], df['host']):
+        event_id = event_ids.get((year, event_type))
+        for host in hosts.split(','):
+            host_id = host_ids.get(host.strip())
+            if event_id and host_id:
+                rows.append({'host_id': host_id, 'event_id': event_id})
+    try:
+        db.session.execute(insert(HostEvent), rows)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        print(f'An error occurred adding host_event data to the paralympics database. Error: {e}')
+        db.session.rollback()
+
+
+def bulk_add_disabilities_data(df):
+    """Add the Disability data, then the DisabilityEvent data using the new disability ids."""
+    split_disabilities = df['disabilities'].str.split(', ')
+    categories = dict.fromkeys(d for disabilities in split_disabilities for d in disabilities)
+    try:
+        db.session.execute(insert(Disability), [{'category': d} for d in categories])
+        db.session.commit()
+
+        query = db.select(Disability.category, Disability.disability_id)
+        disability_ids = dict(db.session.execute(query).all())
+        event_ids = event_id_map()
+        rows = [{'event_id': event_ids[(year, event_type)], 'disability_id': disability_ids[d]}
+                for year, event_type, disabilities in zip(df['year'], df['type'], split_disabilities)
+                if (year, event_type) in event_ids
+                for d in disabilities]
+        db.session.execute(insert(DisabilityEvent), rows)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        print(f'An error occurred adding disability data to the paralympics database. Error: {e}')
+        db.session.rollback()
+
+
+def bulk_add_medal_result_data(df):
+    """Add the MedalResult data with a single insert, matching each result to its event with medal_event_id_map."""
+    event_ids = medal_event_id_map()
+    columns = {'Year': 'year', 'Location': 'location', 'NPC': 'country_code', 'Rank': 'rank', 'Gold': 'gold',
+               'Silver': 'silver', 'Bronze': 'bronze', 'Total': 'total'}
+    rows = []
+    for row in to_mappings(df, columns):
+        event_id = event_ids.get((row.pop('year'), location_key(row.pop('location'))))
+        if event_id:
+            row['event_id'] = event_id
+            rows.append(row)
+    try:
+        db.session.execute(insert(MedalResult), rows)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        print(f'An error occurred adding MedalResult data. Error: {e}')
+        db.session.rollback()
+
+
+def add_all_data_bulk():
+    """Adds all the data using the bulk loading functions.
+
+    As with add_all_data, data is only added to the tables that are empty.
+    """
+    sheets = read_sheets(['events', 'medal_standings', 'npc_codes'])
+    events_df = sheets['events']
+    medals_df = sheets['medal_standings']
+    npc_df = sheets['npc_codes']
+
+    tables_and_functions = [
+        (Country, bulk_add_country_data, npc_df),
+        (Event, bulk_add_event_data, events_df),
+        (Host, lambda df: bulk_add_host_data(df, npc_df), events_df),
+        (HostEvent, bulk_add_host_event_data, events_df),
+        (Disability, bulk_add_disabilities_data, events_df),
+        (MedalResult, bulk_add_medal_result_data, medals_df)
+    ]
+
+    for table, add_data_function, data in tables_and_functions:
+        count_query = db.select(func.count()).select_from(table)
+        if db.session.execute(count_query).scalar() == 0:
+            add_data_function(data)
+
+    # The summary is always rebuilt as it is quick, and any of the tables it is made from may have been added to
+    add_event_summary_data()
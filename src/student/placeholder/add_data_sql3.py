@@ -2,12 +2,28 @@
 Code from COMP0035
 Contains functions to add data to the paralympics database.
 Uses sqlite3
+
+add_all_data inserts the data one row at a time. add_all_data_bulk inserts each table with a single executemany in
+one transaction, which is much quicker for larger data sets.
 """
 import sqlite3
-from importlib import resources
+import time
+from itertools import groupby
+from operator import itemgetter
 
 import pandas as pd
 
+from tutor.data.columnar import iter_record_batches, read_sheet, read_sheets
+from tutor.data.event_summary import rebuild_event_summary
+
+# Queries used to find the ids for each row. These are also checked by python -m student.placeholder.query_audit
+EVENT_ID_SQL = 'SELECT event_id FROM event WHERE year = ? AND type = ?'
+HOST_ID_SQL = 'SELECT host_id FROM host WHERE host = ?'
+DISABILITY_ID_SQL = 'SELECT disability_id FROM disability WHERE category = ?'
+MEDAL_EVENT_SQL = ('SELECT event.year, host.host, event.event_id FROM event '
+                   'JOIN host_event ON host_event.event_id = event.event_id '
+                   'JOIN host ON host.host_id = host_event.host_id')
+
 
 def add_country_data(df, cursor, connection):
     """Add the country data to the paralympics database."""
@@ -46,7 +62,7 @@ def add_event_data(df, cursor, connection):
                 row['highlights'],
                 row['url'])
             cursor.execute(
-                f'INSERT INTO event (type, year, start, end, countries, events, sports, highlights, url) VALUES (?, ? , ?, ?, ?, ?, ?, ?, ?)',
+                'INSERT INTO event (type, year, start, end, countries, events, sports, highlights, url) VALUES (?, ? , ?, ?, ?, ?, ?, ?, ?)',
                 values)
             # insert the participants data
             event_id = cursor.lastrowid
@@ -67,34 +83,48 @@ def add_event_data(df, cursor, connection):
             connection.rollback()
 
 
-def add_host_data(df_events, cursor, connection):
-    """Add data to the normalised paralympics database."""
+def host_country_codes(df_events, df_npc):
+    """
+    Return the unique host and country pairs in the events with the country code of each.
+
+    The host and country columns have comma separated values, e.g. 'Stoke Mandeville, New York' and
+    'Great Britain, United States of America'. Both are split into lists and exploded together so that each host is on
+    a row with its country. The country codes are then found by merging with the npc_codes data.
+
+    Parameters:
+        df_events: DataFrame of the events data
+        df_npc: DataFrame of the npc_codes data
+
+    Returns:
+        host_countries: DataFrame with the columns host, country and code. Hosts in a country that is not in the npc
+        codes are not included. A host that is in more than one country is only included with the first, as host is
+        unique in the host table, see tutor.data.indexes.
+    """
+    pairs = pd.DataFrame({'host': df_events['host'].str.split(','), 'country': df_events['country'].str.split(',')})
+    pairs = pairs.explode(['host', 'country'], ignore_index=True)
+    pairs['host'] = pairs['host'].str.strip()
+    pairs['country'] = pairs['country'].str.strip()
+    pairs = pairs.drop_duplicates(subset=['host', 'country'])
+    codes = df_npc[['name', 'code']].drop_duplicates(subset='name')
+    host_countries = pairs.merge(codes, left_on='country', right_on='name', how='inner')
+    host_countries = host_countries.drop_duplicates(subset='host')
+    return host_countries[['host', 'country', 'code']]
+
+
+def add_host_data(df_events, cursor, connection, df_npc=None):
+    """Add data to the normalised paralympics database.
+
+    df_npc is the npc_codes data used to find the country codes, it is read from the data file if not given.
+    """
 
     try:
-        # Extract unique host and country pairs
-        # Initialize an empty DataFrame with the columns needed
-        host_country_df = pd.DataFrame(columns=['host', 'country'])
-        # Iterate over each row in the events DataFrame and split each column into multiple values where there is ','
-        for index, row in df_events.iterrows():
-            hosts = row['host'].split(',')
-            countries = row['country'].split(',')
-            # Create pairs of each host with each country and append to the DataFrame
-            for host, country in zip(hosts, countries):
-                new_row = pd.DataFrame({'host': [host.strip()], 'country': [country.strip()]})
-                host_country_df = pd.concat([host_country_df, new_row], ignore_index=True)
-        # Remove duplicate hosts from the dataframe
-        host_country_df = host_country_df.drop_duplicates(subset=['host', 'country'])
-
-        # Iterate over the dataframe, add the host and country to the host table
-        for index, row in host_country_df.iterrows():
-            # Get the country code from the country table
-            country_name = row['country']
-            select_sql = f'SELECT code from country where name="{country_name}"'
-            result = cursor.execute(select_sql).fetchone()
-            country_code = result[0]
-            # Insert into the host table
-            host = row['host']
-            cursor.execute('INSERT INTO host (country_code, host) VALUES (?, ?)', (country_code, host))
+        if df_npc is None:
+            df_npc = read_sheet('npc_codes')
+        # Find the unique host and country pairs and the country codes
+        host_countries = host_country_codes(df_events, df_npc)
+        # Add the hosts and country codes to the host table
+        cursor.executemany('INSERT INTO host (country_code, host) VALUES (?, ?)',
+                           zip(host_countries['code'], host_countries['host']))
 
         # Commit the changes
         connection.commit()
@@ -113,13 +143,14 @@ def add_host_event_data(df, cursor, connection):
         for index, row in df.iterrows():
             hosts = row['host'].split(',')
             # Find the event id for the event. This matches based on the year and type of event.
-            event_id = cursor.execute(
-                'SELECT event_id FROM event WHERE year = ? AND type = ?',
-                (row['year'], row['type'])
-            ).fetchone()[0]
+            event_id = cursor.execute(EVENT_ID_SQL, (row['year'], row['type'])).fetchone()[0]
             # Find the host_id for each host
             for host in hosts:
-                host_id = cursor.execute(f'SELECT host_id FROM host WHERE host = "{host.strip()}"').fetchall()[0][0]
+                host_row = cursor.execute(HOST_ID_SQL, (host.strip(),)).fetchone()
+                # Hosts in a country that is not in the npc codes are not in the host table, see host_country_codes
+                if host_row is None:
+                    continue
+                host_id = host_row[0]
                 # Insert the host_event pair
                 cursor.execute('INSERT INTO host_event (host_id, event_id) VALUES (?, ?)', (host_id, event_id))
 
@@ -149,16 +180,13 @@ def add_disabilities_data(df, cursor, connection):
         # Iterate each result row in the event table
         for index, row in df.iterrows():
             # find the event_id
-            event_id = cursor.execute('SELECT event_id FROM event WHERE year = ? AND type = ?',
-                                      (row['year'], row['type'])).fetchone()[0]
+            event_id = cursor.execute(EVENT_ID_SQL, (row['year'], row['type'])).fetchone()[0]
             # split the values for the disabilities
             disabilities = row['disabilities'].split(', ')
             # add each diability
             for d in disabilities:
                 # find the disability_id.
-                disability_id = cursor.execute(
-                    'SELECT disability_id FROM disability WHERE category LIKE ?', (d,)
-                ).fetchone()[0]
+                disability_id = cursor.execute(DISABILITY_ID_SQL, (d,)).fetchone()[0]
                 # Insert into the DisabilityEvent table
                 cursor.execute('INSERT INTO disability_event (event_id, disability_id) VALUES (?, ?)',
                                (event_id, disability_id))
@@ -171,15 +199,37 @@ def add_disabilities_data(df, cursor, connection):
             connection.rollback()
 
 
+def location_key(name):
+    """Return the host name in lower case with '-' replaced by a space, e.g. Tignes-Albertville is tignes albertville"""
+    return ' '.join(name.lower().replace('-', ' ').split())
+
+
+def medal_event_id_map(cursor):
+    """
+    Return a dictionary to find the event for a row of the medal standings.
+
+    The medal standings have the year and location but not the type of event. In some years there are summer and
+    winter events, so the location is matched to the event's hosts. The names are compared with location_key as the
+    spelling is not always the same, e.g. 'Tignes Albertville' and 'Tignes-Albertville'.
+
+    Returns:
+        event_ids: dict of {(year, location key): event_id}
+    """
+    return {(year, location_key(host)): event_id for year, host, event_id in cursor.execute(MEDAL_EVENT_SQL)}
+
+
 def add_medal_result_data(df, cursor, connection):
     """Add MedalResult data to the paralympics database."""
 
     try:
+        # Find the event ids for each year and host. This needs the host and host_event data to have been added.
+        event_ids = medal_event_id_map(cursor)
         # Iterate each result row, get the event_id and code and insert into the MedalResult table
         for index, row in df.iterrows():
-            # Find the event id for the event. This matches based on the year and type of event.
-            qry = f'SELECT event_id FROM Event WHERE year = {row['Year']}'
-            event_id = cursor.execute(qry).fetchone()[0]
+            event_id = event_ids.get((row['Year'], location_key(row['Location'])))
+            if event_id is None:
+                print(f'No event found for the medal results for {row["Location"]} {row["Year"]}')
+                continue
             # Insert the medal results
             values = (event_id, row['NPC'], row['Rank'], row['Gold'], row['Silver'], row['Bronze'], row['Total'])
             sql = 'INSERT INTO medal_result (event_id, country_code, rank, gold, silver, bronze, total) VALUES (?, ?, ?, ?, ?, ?, ?)'
@@ -193,6 +243,18 @@ def add_medal_result_data(df, cursor, connection):
             connection.rollback()
 
 
+def add_event_summary_data(cursor, connection):
+    """Rebuild the event_summary table from the event, participants, host_event and host data."""
+    try:
+        rebuild_event_summary(cursor)
+        connection.commit()
+
+    except sqlite3.Error as e:
+        print(f'An error occurred adding event_summary data. Error: {e}')
+        if connection:
+            connection.rollback()
+
+
 def add_all_data(cur, conn):
     """Adds all the data.
 
@@ -201,18 +263,198 @@ def add_all_data(cur, conn):
     conn: sqlite connection object
     cur: sqlite cursor object
     """
-    # Specifies the path to the data file
-    data_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
-
     # Read data and create pandas dataframes
-    events_df = pd.read_excel(data_path, sheet_name='events')
-    medals_df = pd.read_excel(data_path, sheet_name='medal_standings')
-    npc_df = pd.read_excel(data_path, sheet_name='npc_codes')
+    # Uses the Arrow files if they have been created with `python -m tutor.data.columnar`, otherwise paralympics.xlsx
+    sheets = read_sheets(['events', 'medal_standings', 'npc_codes'])
+    events_df = sheets['events']
+    medals_df = sheets['medal_standings']
+    npc_df = sheets['npc_codes']
 
     # add data to the tables
     add_country_data(npc_df, cur, conn)
-    add_host_data(events_df, cur, conn)
+    add_host_data(events_df, cur, conn, npc_df)
     add_event_data(events_df, cur, conn)
     add_host_event_data(events_df, cur, conn)
     add_disabilities_data(events_df, cur, conn)
     add_medal_result_data(medals_df, cur, conn)
+    add_event_summary_data(cur, conn)
+
+
+# Bulk loading
+# The functions above insert one row at a time and run a SELECT for each row to find the ids it needs, so the time
+# taken grows with the number of rows multiplied by the cost of each lookup. The functions below build a dictionary for
+# each lookup once, insert each table with a single executemany and commit once at the end.
+
+def to_records(df, columns):
+    """Return the columns of the dataframe as a list of tuples of Python values, with missing values as None."""
+    values = df[columns].astype(object)
+    values = values.where(values.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+def insert_many(cursor, table, columns, rows, timings):
+    """
+    Insert the rows into the table with a single executemany.
+
+    Parameters:
+        cursor: sqlite cursor object
+        table: str  Name of the table
+        columns: list of the column names, in the same order as the values in each row
+        rows: list of tuples of values
+        timings: dict that the number of rows and time taken are added to, {table: (rows, seconds)}
+    """
+    column_names = ', '.join(columns)
+    placeholders = ', '.join('?' * len(columns))
+    start = time.perf_counter()
+    cursor.executemany(f'INSERT INTO {table} ({column_names}) VALUES ({placeholders})', rows)
+    # A table can be inserted in several batches, so add to the totals
+    total_rows, total_seconds = timings.get(table, (0, 0.0))
+    timings[table] = (total_rows + len(rows), total_seconds + time.perf_counter() - start)
+
+
+def print_load_report(timings):
+    """Print the number of rows, time taken and rows per second for each table."""
+    for table, (rows, seconds) in timings.items():
+        rate = rows / seconds if seconds > 0 else float('inf')
+        print(f'{table:<18} {rows:>6} rows in {seconds:.4f}s ({rate:,.0f} rows/sec)')
+
+
+def bulk_add_country_data(df, cursor, timings):
+    """Add the country data."""
+    columns = ['code', 'name', 'region', 'sub_region', 'member_type', 'notes']
+    insert_many(cursor, 'country', columns, to_records(df, columns), timings)
+
+
+def bulk_add_host_data(df_events, df_npc, cursor, timings):
+    """Add the host data and return a dictionary of {host: host_id}."""
+    host_countries = host_country_codes(df_events, df_npc)
+    rows = list(zip(host_countries['code'], host_countries['host']))
+    insert_many(cursor, 'host', ['country_code', 'host'], rows, timings)
+    # host_country_codes gives each host once, as host is unique in the host table, so each host has one host_id
+    return dict(cursor.execute('SELECT host, host_id FROM host'))
+
+
+def bulk_add_event_data(df, cursor, timings):
+    """Add the event and participant data and return a dictionary of {(year, type): event_id}."""
+    df = df.assign(start=df['start'].dt.strftime('%d/%m/%Y'), end=df['end'].dt.strftime('%d/%m/%Y'))
+    columns = ['type', 'year', 'start', 'end', 'countries', 'events', 'sports', 'highlights', 'url']
+    insert_many(cursor, 'event', columns, to_records(df, columns), timings)
+
+    event_ids = {}
+    for event_id, year, event_type in cursor.execute('SELECT event_id, year, type FROM event ORDER BY event_id'):
+        event_ids.setdefault((year, event_type), event_id)
+
+    rows = [(event_ids[(year, event_type)], m, f, total)
+            for year, event_type, m, f, total in
+            to_records(df, ['year', 'type', 'participants_m', 'participants_f', 'participants'])]
+    insert_many(cursor, 'participants', ['event_id', 'participants_m', 'participants_f', 'participants'], rows,
+                timings)
+    return event_ids
+
+
+def host_event_rows(df, event_ids, host_ids):
+    """Return the (host_id, event_id) of each host of each event.
+
+    Hosts in a country that is not in the npc codes are not in the host table, see host_country_codes, so are skipped.
+    """
+    return [(host_ids[host], event_ids[(year, event_type)])
+            for year, event_type, hosts in zip(df['year'], df['type'], df['host'])
+            for host in (h.strip() for h in hosts.split(','))
+            if host in host_ids]
+
+
+def bulk_add_host_event_data(df, cursor, event_ids, host_ids, timings):
+    """Add the HostEvent data using the event and host id dictionaries."""
+    rows = host_event_rows(df, event_ids, host_ids)
+    insert_many(cursor, 'host_event', ['host_id', 'event_id'], rows, timings)
+
+
+def bulk_add_disabilities_data(df, cursor, event_ids, timings):
+    """Add the Disability and DisabilityEvent data using the event id dictionary."""
+    split_disabilities = df['disabilities'].str.split(', ')
+    # dict.fromkeys keeps the order the categories first appear in, so the ids are the same each time
+    categories = dict.fromkeys(d for disabilities in split_disabilities for d in disabilities)
+    insert_many(cursor, 'disability', ['category'], [(d,) for d in categories], timings)
+    disability_ids = {category: disability_id for disability_id, category in
+                      cursor.execute('SELECT disability_id, category FROM disability')}
+
+    rows = [(event_ids[(year, event_type)], disability_ids[d])
+            for year, event_type, disabilities in zip(df['year'], df['type'], split_disabilities)
+            for d in disabilities]
+    insert_many(cursor, 'disability_event', ['event_id', 'disability_id'], rows, timings)
+
+
+def medal_result_rows(df, event_ids):
+    """Return the medal standings as (event_id, country_code, rank, gold, silver, bronze, total) tuples.
+
+    event_ids is the dictionary from medal_event_id_map. Rows with no matching event are left out.
+    """
+    rows = []
+    for year, location, *values in to_records(df, ['Year', 'Location', 'NPC', 'Rank', 'Gold', 'Silver', 'Bronze',
+                                                   'Total']):
+        event_id = event_ids.get((year, location_key(location)))
+        if event_id is None:
+            print(f'No event found for the medal results for {location} {year}')
+            continue
+        rows.append((event_id, *values))
+    return rows
+
+
+def bulk_add_medal_result_data(df, cursor, timings):
+    """Add the MedalResult data, or a batch of it. This needs the host and host_event data to have been added."""
+    rows = medal_result_rows(df, medal_event_id_map(cursor))
+    columns = ['event_id', 'country_code', 'rank', 'gold', 'silver', 'bronze', 'total']
+    insert_many(cursor, 'medal_result', columns, rows, timings)
+
+
+def bulk_add_event_summary_data(cursor, timings):
+    """Rebuild the event_summary table from the tables added above."""
+    start = time.perf_counter()
+    rows = rebuild_event_summary(cursor)
+    timings['event_summary'] = (rows, time.perf_counter() - start)
+
+
+def add_all_data_bulk(cur, conn):
+    """Adds all the data using the bulk loading functions, in a single transaction.
+
+    Prints the number of rows and rows per second for each table.
+
+    Parameters
+    ----------
+    conn: sqlite connection object
+    cur: sqlite cursor object
+
+    Returns
+    -------
+    timings: dict of {table: (rows, seconds)}
+    """
+    timings = {}
+    try:
+        # The sheets are read at the same time and come back in this order, in batches. The npc codes and events are
+        # small and needed whole to find the ids, the medal standings are added a batch at a time.
+        batches = iter_record_batches(['npc_codes', 'events', 'medal_standings'])
+        for sheet_name, sheet_batches in groupby(batches, key=itemgetter(0)):
+            sheet_batches = (batch for _, batch in sheet_batches)
+            if sheet_name == 'npc_codes':
+                npc_df = pd.concat(sheet_batches, ignore_index=True)
+                bulk_add_country_data(npc_df, cur, timings)
+            elif sheet_name == 'events':
+                events_df = pd.concat(sheet_batches, ignore_index=True)
+                host_ids = bulk_add_host_data(events_df, npc_df, cur, timings)
+                event_ids = bulk_add_event_data(events_df, cur, timings)
+                bulk_add_host_event_data(events_df, cur, event_ids, host_ids, timings)
+                bulk_add_disabilities_data(events_df, cur, event_ids, timings)
+            else:
+                for medals_batch in sheet_batches:
+                    bulk_add_medal_result_data(medals_batch, cur, timings)
+        bulk_add_event_summary_data(cur, timings)
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f'An error occurred adding the data to the paralympics database. Error: {e}')
+        if conn:
+            conn.rollback()
+        return timings
+
+    print_load_report(timings)
+    return timings
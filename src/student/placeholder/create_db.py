@@ -4,16 +4,18 @@ Contains functions to create the paralympics database without data.
 """
 import sqlite3
 
-from student.placeholder import add_data
+from student.placeholder import add_data_sql3
+from tutor.data.indexes import INDEX_SCHEMA
 
 
-def create_db(cursor, connection):
+def create_db(cursor, connection, bulk=True):
     """Create the paralympics database structure and add the data.
 
     Parameters
     ----------
     connection: sqlite connection object
     cursor: sqlite cursor object
+    bulk: True to add the data with add_data_sql3.add_all_data_bulk, False to add it one row at a time
     """
 
     # Define the tables and relationships using SQL statements
@@ -127,6 +129,7 @@ def create_db(cursor, connection):
 
     try:
         # Drop each table if they already exist
+        cursor.execute('DROP TABLE IF EXISTS event_summary;')
         cursor.execute('DROP TABLE IF EXISTS host_event;')
         cursor.execute('DROP TABLE IF EXISTS disability_event;')
         cursor.execute('DROP TABLE IF EXISTS participants;')
@@ -156,11 +159,18 @@ def create_db(cursor, connection):
         cursor.execute(student_response_sql)
         cursor.execute(medal_result_sql)
 
+        # Create the indexes, see tutor.data.indexes
+        for sql in INDEX_SCHEMA:
+            cursor.execute(sql)
+
         # Commit the changes
         connection.commit()
 
         # Call the function to add the data
-        add_data.add_all_data(cursor, connection)
+        if bulk:
+            add_data_sql3.add_all_data_bulk(cursor, connection)
+        else:
+            add_data_sql3.add_all_data(cursor, connection)
 
     except sqlite3.Error as e:
         print(f'An error occurred creating the database. Error: {e}')
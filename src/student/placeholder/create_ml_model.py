@@ -2,58 +2,261 @@
 Machine learning is not covered in the module.
 This is a simple example of how to create a model using the medal standings data.
 `pip install scikit-learn` is required before you can run this code.
+
+Several linear models are compared using k-fold cross-validation. Each fit of a model on one fold is run in a separate
+process, so the search uses every core, and the time taken to fit and predict is recorded with the scores. The model
+with the best mean R2 (coefficient of determination) is then fitted on all the data.
+
+The model is saved twice: model.pkl is the whole scikit-learn pipeline, and model.npz has only its coefficients, which
+student.flask_paralympics.compact_model uses to make the same predictions without importing scikit-learn. Both files
+are written to a temporary file and then renamed, so an app that reloads the model never reads a partly written file.
+
+The medal standings are read from the Arrow file made by tutor.data.columnar, which is created first if it is missing
+or older than paralympics.xlsx, so only the first run after the data changes parses the Excel file.
+
+To train and save the model, run:
+python -m student.placeholder.create_ml_model
 """
-from pathlib import Path
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import resources
 
 import joblib
+import numpy as np
 import pandas as pd
+from sklearn.base import clone
 from sklearn.compose import ColumnTransformer
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import train_test_split
+from sklearn.linear_model import Lasso, LinearRegression, Ridge
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import KFold
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder
 
+from tutor.data import columnar
 
-def train_and_save_model():
+# The models compared by cross-validation. They are all linear, so the best one can be saved by export_compact_model.
+CANDIDATES = {
+    "linear": LinearRegression(),
+    "ridge alpha=0.1": Ridge(alpha=0.1),
+    "ridge alpha=1": Ridge(alpha=1.0),
+    "ridge alpha=10": Ridge(alpha=10.0),
+    "lasso alpha=0.01": Lasso(alpha=0.01, max_iter=50000),
+    "lasso alpha=0.1": Lasso(alpha=0.1, max_iter=50000),
+}
+
+# The training data for the worker processes, set once per process by init_worker rather than sent with each task
+_worker_data = {}
+
+
+def load_training_data():
     """
-    Train a model to predict Total based on Year and Team, and save it to a .pkl file.
+    Read the medal standings, creating the Arrow files first if they are missing or older than paralympics.xlsx.
+
+    Returns:
+        data: DataFrame with the Year, Team and Total columns, without rows that have missing values
     """
-    # Read the data into a DataFrame
-    para_excel = Path(__file__).parent.parent.joinpath("data", "paralympics.xlsx")
-    cols = ["Year", "Rank", "Team", "Gold", "Silver", "Bronze", "Total"]
-    data = pd.read_excel(para_excel, sheet_name="medal_standings", usecols=cols)
+    package = "student.data"
+    excel_path = resources.files(package).joinpath("paralympics.xlsx")
+    path = columnar.arrow_path("medal_standings", package)
+    if columnar.feather is not None and (not path.is_file() or path.stat().st_mtime < excel_path.stat().st_mtime):
+        columnar.convert_excel(package)
+    data = columnar.read_sheet("medal_standings", package=package, columns=["Year", "Team", "Total"])
 
     # Drop rows with NaNs since the accuracy of the model is not the focus here
-    data.dropna(inplace=True)
+    return data.dropna()
 
-    # Features and target
-    X = data[['Year', 'Team']]
-    y = data['Total']
 
+def make_pipeline(regressor, teams):
+    """
+    Create a pipeline that one-hot encodes the Team, passes the Year through, and fits the regressor.
+
+    Parameters:
+        regressor: scikit-learn regression model, e.g. LinearRegression()
+        teams: sorted list of all the team names. These are given to the OneHotEncoder so that every fold of the
+        cross-validation has the same columns, even if a team is only in the test rows.
+
+    Returns:
+        pipeline: unfitted Pipeline
+    """
     # One-hot encode the 'Team' column
     preprocessor = ColumnTransformer(
         transformers=[
-            ('team', OneHotEncoder(), ['Team'])
+            ('team', OneHotEncoder(categories=[teams]), ['Team'])
         ],
         remainder='passthrough'
     )
 
     # Create a pipeline with preprocessing and regression model
-    pipeline = Pipeline(steps=[
+    return Pipeline(steps=[
         ('preprocessor', preprocessor),
-        ('regressor', LinearRegression())
+        ('regressor', clone(regressor))
     ])
 
-    # Split the data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-    # Train the model
-    pipeline.fit(X_train, y_train)
+def init_worker(X, y, teams):
+    """Store the training data in a worker process."""
+    _worker_data.update(X=X, y=y, teams=teams)
+
+
+def evaluate_candidate(name, fold, train_index, test_index):
+    """
+    Fit a candidate model on the training rows of a fold and score it on the test rows. Runs in a worker process.
+
+    Parameters:
+        name: str  Key of the model in CANDIDATES
+        fold: int  Number of the fold
+        train_index: array of the positions of the training rows
+        test_index: array of the positions of the test rows
+
+    Returns:
+        result: dict of the name, fold, r2, mae, fit_seconds and predict_seconds
+    """
+    X, y = _worker_data["X"], _worker_data["y"]
+    pipeline = make_pipeline(CANDIDATES[name], _worker_data["teams"])
+
+    start = time.perf_counter()
+    pipeline.fit(X.iloc[train_index], y.iloc[train_index])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictions = pipeline.predict(X.iloc[test_index])
+    predict_seconds = time.perf_counter() - start
+
+    y_test = y.iloc[test_index]
+    return {
+        "name": name,
+        "fold": fold,
+        "r2": r2_score(y_test, predictions),
+        "mae": mean_absolute_error(y_test, predictions),
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+    }
+
+
+def cross_validate_candidates(X, y, teams, folds=5, workers=None):
+    """
+    Score every candidate model on every fold, in parallel across a pool of processes.
+
+    Parameters:
+        X: DataFrame with the Year and Team columns
+        y: Series of the Total medals
+        teams: sorted list of all the team names
+        folds: int  Number of folds
+        workers: int  Number of processes, or None for one per core
+
+    Returns:
+        results: DataFrame with a row of scores and timings for each candidate and fold
+    """
+    splits = list(KFold(n_splits=folds, shuffle=True, random_state=42).split(X))
+    tasks = [(name, fold, train_index, test_index)
+             for name, (fold, (train_index, test_index)) in itertools.product(CANDIDATES, enumerate(splits))]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(X, y, teams)) as executor:
+        results = list(executor.map(evaluate_candidate, *zip(*tasks)))
+    return pd.DataFrame(results)
+
+
+def summarise_results(results):
+    """Return the mean and standard deviation of the scores, and the total times, of each candidate, best first."""
+    summary = results.groupby("name").agg(
+        r2_mean=("r2", "mean"),
+        r2_std=("r2", "std"),
+        mae_mean=("mae", "mean"),
+        fit_seconds=("fit_seconds", "sum"),
+        predict_seconds=("predict_seconds", "sum"),
+    )
+    return summary.sort_values("r2_mean", ascending=False)
+
+
+def print_training_report(summary, folds, workers, seconds):
+    """Print the scores and times of each candidate, and the total time taken."""
+    print(f'{"model":<18} {"R2 mean":>8} {"R2 std":>8} {"MAE":>8} {"fit s":>8} {"predict s":>10}')
+    for name, row in summary.iterrows():
+        print(f'{name:<18} {row.r2_mean:>8.3f} {row.r2_std:>8.3f} {row.mae_mean:>8.2f} '
+              f'{row.fit_seconds:>8.3f} {row.predict_seconds:>10.4f}')
+    print(f'{len(summary)} models x {folds} folds in {workers or os.cpu_count()} processes, {seconds:.2f}s in total')
+
+
+def save_atomically(path, write):
+    """
+    Write a file by writing a temporary file in the same folder and then renaming it, which replaces the file at once.
+
+    Parameters:
+        path: str  Path of the file
+        write: function that takes an open binary file and writes the contents
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=folder, delete=False) as file:
+        try:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            file.close()
+            os.unlink(file.name)
+            raise
+    # Temporary files can only be read by their owner, give the file the usual permissions
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, path)
+
+
+def export_compact_model(pipeline, path):
+    """
+    Save the intercept and coefficients of the fitted pipeline to a .npz file, for compact_model to predict with.
+
+    Parameters:
+        pipeline: the fitted Pipeline of the ColumnTransformer (OneHotEncoder of Team, Year passed through) and the
+        linear regressor
+        path: str or open binary file  Where to write the .npz data
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    regressor = pipeline.named_steps['regressor']
+    # The columns the ColumnTransformer outputs for each transformer, the one-hot team columns then the Year
+    columns = preprocessor.output_indices_
+    np.savez(path,
+             intercept=regressor.intercept_,
+             year_coef=regressor.coef_[columns['remainder']][0],
+             teams=preprocessor.named_transformers_['team'].categories_[0].astype(str),
+             team_coefs=regressor.coef_[columns['team']])
+
+
+def train_and_save_model(folds=5, workers=None, output_dir="."):
+    """
+    Choose the best model by cross-validation, train it on all the data, and save it to a .pkl file and a .npz file.
+
+    Parameters:
+        folds: int  Number of cross-validation folds
+        workers: int  Number of processes, or None for one per core
+        output_dir: str  Folder to save model.pkl and model.npz in
+
+    Returns:
+        summary: DataFrame of the scores and times of each candidate, best first
+    """
+    start = time.perf_counter()
+    data = load_training_data()
+
+    # Features and target
+    X = data[['Year', 'Team']]
+    y = data['Total']
+    teams = sorted(X['Team'].unique())
+
+    results = cross_validate_candidates(X, y, teams, folds, workers)
+    summary = summarise_results(results)
+
+    # Train the best model on all the data
+    best = summary.index[0]
+    pipeline = make_pipeline(CANDIDATES[best], teams)
+    pipeline.fit(X, y)
 
-    # Save the model to a .pkl file
-    joblib.dump(pipeline, 'model.pkl')
+    # Save the model to a .pkl file, and the coefficients for making predictions without scikit-learn to a .npz file
+    save_atomically(os.path.join(output_dir, 'model.pkl'), lambda file: joblib.dump(pipeline, file))
+    save_atomically(os.path.join(output_dir, 'model.npz'), lambda file: export_compact_model(pipeline, file))
 
-    print("Model saved to model.pkl")
+    print_training_report(summary, folds, workers, time.perf_counter() - start)
+    print(f"Best model ({best}) saved to model.pkl and model.npz")
+    return summary
 
 
 if __name__ == "__main__":
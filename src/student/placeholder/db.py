@@ -1,6 +1,8 @@
 """Copied from https://flask.palletsprojects.com/en/stable/tutorial/database/#define-and-access-the-database
 To create the database you need to run the following command in a Terminal:
 flask --app tutor.flask_para_sqlite init-db
+
+Connections are opened with the SQLITE_PROFILE connection profile from the config, "write" if it is not set.
 """
 import importlib.resources
 import sqlite3
@@ -9,21 +11,30 @@ from datetime import datetime
 import click
 from flask import current_app, g
 
+from student.placeholder import query_trace
+from tutor.data import connection_profiles
+
 
 # Copied from https://flask.palletsprojects.com/en/stable/tutorial/database/
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect(
+        # If query tracing is turned on (see query_trace.py) use a connection that records the time of each query
+        tracer = current_app.extensions.get('query_tracer')
+        # The journal mode, cache and other PRAGMAs (including foreign key support) are set by the connection profile
+        # named by SQLITE_PROFILE in the config, see tutor/data/connection_profiles.py
+        g.db = connection_profiles.connect_from_config(
             current_app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
+            current_app.config,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            factory=sqlite3.Connection if tracer is None else query_trace.TracingConnection
         )
+        if tracer is not None:
+            g.db.tracer = tracer
         g.db.row_factory = sqlite3.Row
 
-        # Enable foreign key support
-        g.db.execute('PRAGMA foreign_keys = ON;')
-
-        # Print SQL to the terminal for debugging purposes
-        g.db.set_trace_callback(trace_callback)
+        # Print SQL to the terminal for debugging purposes. This slows every query so is off unless SQL_ECHO is set.
+        if current_app.config.get('SQL_ECHO', False):
+            g.db.set_trace_callback(trace_callback)
 
     return g.db
 
@@ -62,6 +73,7 @@ sqlite3.register_converter(
 def init_app(app):
     app.teardown_appcontext(close_db)
     app.cli.add_command(init_db_command)
+    query_trace.init_app(app)
 
 
 def trace_callback(query):
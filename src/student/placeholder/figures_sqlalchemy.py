@@ -1,7 +1,13 @@
 import plotly.express as px
 import pandas as pd
 
-from student.flask_paralympics.models import Event, Participants
+from student.flask_paralympics.models import EventSummary
+from tutor.data.versioned_file import database_version
+
+# The HTML of the line chart for each database file and feature, {(path, feature): (data version, fig_html)}.
+# A chart is only created once for each version of the data, see tutor.data.versioned_file.database_version, so it is
+# created again after the database is changed, e.g. by python -m student.placeholder.sync_data
+line_chart_cache = {}
 
 
 def line_chart(feature, db):
@@ -22,8 +28,17 @@ def line_chart(feature, db):
         # Make sure it is lowercase to match the dataframe column names
         feature = feature.lower()
 
+    # Return the chart from the cache if it has already been created from this version of the database
+    path = db.get_engine().url.database
+    version = database_version(path)
+    entry = line_chart_cache.get((path, feature))
+    if version is not None and entry is not None and entry[0] == version:
+        return entry[1]
+
     # Get the data from the database using pandas.read_sql_query and FlaskSQLAlchemy.
-    stmt = db.select(Event, Participants).join(Participants)
+    # event_summary has a row for each host of an event, host_number == 1 gives one row per event
+    stmt = db.select(EventSummary.type, EventSummary.year, getattr(EventSummary, feature)).where(
+        EventSummary.host_number == 1).order_by(EventSummary.type, EventSummary.year)
     line_chart_df = pd.read_sql_query(stmt, db.get_engine())
 
     # Set the title for the chart using the value of 'feature'
@@ -48,6 +63,9 @@ def line_chart(feature, db):
                   template="simple_white"
                   )
 
-    # Convert to HTML
-    fig_html = {"fig": fig.to_html(full_html=False, include_plotlyjs=True, div_id="line-chart")}
+    # Convert to HTML. plotly.js is not included as the page loads it from the static folder, see plotly_js.py
+    fig_html = {"fig": fig.to_html(full_html=False, include_plotlyjs=False, div_id="line-chart")}
+    # An in-memory database has no version, so its charts are not cached
+    if version is not None:
+        line_chart_cache[(path, feature)] = (version, fig_html)
     return fig_html
\ No newline at end of file
@@ -1,6 +1,26 @@
 import plotly.express as px
 import pandas as pd
 
+from tutor.data.versioned_file import database_version
+
+# The query for the line chart data, also checked by python -m student.placeholder.query_audit
+# event_summary has a row for each host of an event, host_number = 1 gives one row per event
+LINE_CHART_SQL = '''SELECT type, year, countries, events, sports, participants FROM event_summary
+                    WHERE host_number = 1 ORDER BY type, year'''
+
+# The HTML of the line chart for each database file and feature, {(path, feature): (data version, fig_html)}.
+# A chart is only created once for each version of the data, see tutor.data.versioned_file.database_version, so it is
+# created again after the database is changed, e.g. by python -m student.placeholder.sync_data
+line_chart_cache = {}
+
+
+def database_path(db):
+    """Return the path of the main database file of a sqlite3 connection, '' for an in-memory database."""
+    for _, name, path in db.execute('PRAGMA database_list'):
+        if name == 'main':
+            return path
+    return ''
+
 
 def line_chart(feature, db):
     """ Creates a line chart with data from paralympics.xlsx
@@ -21,9 +41,15 @@ def line_chart(feature, db):
         # Make sure it is lowercase to match the dataframe column names
         feature = feature.lower()
 
+    # Return the chart from the cache if it has already been created from this version of the database
+    path = database_path(db)
+    version = database_version(path)
+    entry = line_chart_cache.get((path, feature))
+    if version is not None and entry is not None and entry[0] == version:
+        return entry[1]
+
     # Get the data from the database using pandas.read_sql_query and the sqlite3 database connection
-    query = 'SELECT * FROM event JOIN participants on event.event_id = participants.event_id;'
-    df = pd.read_sql_query(query, db)
+    df = pd.read_sql_query(LINE_CHART_SQL, db)
 
     # Set the title for the chart using the value of 'feature'
     title_text = f"How has the number of {feature} changed over time?"
@@ -47,6 +73,9 @@ def line_chart(feature, db):
                   template="simple_white"
                   )
 
-    # Convert to HTML
-    fig_html = {"fig": fig.to_html(full_html=False, include_plotlyjs=True, div_id="line-chart")}
+    # Convert to HTML. plotly.js is not included as the page loads it from the static folder, see plotly_js.py
+    fig_html = {"fig": fig.to_html(full_html=False, include_plotlyjs=False, div_id="line-chart")}
+    # An in-memory database has no version, so its charts are not cached
+    if version is not None:
+        line_chart_cache[(path, feature)] = (version, fig_html)
     return fig_html
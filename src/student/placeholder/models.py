@@ -6,7 +6,7 @@ The 'db' parameter is defined during activity 7.2.
 Complete the code for the quiz tables at the end of the models.py file."""
 from typing import List
 
-from sqlalchemy import ForeignKey, Integer, String, Text
+from sqlalchemy import Float, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from tutor.student import db
@@ -139,6 +139,33 @@ class MedalResult(db.Model):
     country: Mapped["Country"] = relationship(back_populates="medal_results")
 
 
+class EventSummary(db.Model):
+    """
+    One row for each host of each event, with the event, host and participants data already joined.
+
+    Read by the charts so that they query a single table. The rows are replaced by the add_data functions after the
+    data is added, see tutor.data.event_summary, so it should not be changed directly.
+    """
+    __tablename__ = 'event_summary'
+
+    event_id = mapped_column(Integer, primary_key=True)
+    host_id = mapped_column(Integer, primary_key=True)
+    host_number = mapped_column(Integer, nullable=False)
+    type = mapped_column(Text, nullable=False)
+    year = mapped_column(Integer, nullable=False)
+    host = mapped_column(Text, nullable=False)
+    country_code = mapped_column(Text)
+    latitude = mapped_column(Float)
+    longitude = mapped_column(Float)
+    host_year = mapped_column(Text, nullable=False)
+    countries = mapped_column(Integer)
+    events = mapped_column(Integer)
+    sports = mapped_column(Integer)
+    participants_m = mapped_column(Integer)
+    participants_f = mapped_column(Integer)
+    participants = mapped_column(Integer)
+
+
 class Quiz(db.Model):
     pass
 
@@ -0,0 +1,240 @@
+"""
+Checks that the database queries made by the apps and the data loaders use indexes.
+
+Each query is run through EXPLAIN QUERY PLAN and a step of the plan is flagged if SQLite has to read every row of a
+table (SCAN) or build a temporary index (AUTOMATIC INDEX) to run it. Some queries are meant to read every row, e.g. to
+create a chart of all the events; these may scan the first table in their plan, but the tables they join to must still
+be found using an index, otherwise the query gets slower with the square of the number of rows. A query with ?
+parameters looks up rows by value, so must use an index for every table.
+
+The Dash app queries are checked against tutor/data/paralympics.db. The other queries are collected by running the
+sqlite3 loaders (row by row and bulk), sync_data, the line chart and, if Flask-SQLAlchemy is installed, the ORM loaders
+in add_data with a QueryCollector, so a new query is checked without being added to a list here. Each is checked
+against the database it was made on: one created by student.placeholder.create_db, or by db.create_all() for the ORM.
+
+To run the audit:
+python -m student.placeholder.query_audit
+
+The exit status is 1 if any query is flagged, so the audit can be run as a check before committing.
+"""
+import contextlib
+import io
+import sqlite3
+import sys
+from importlib import resources
+
+from student.placeholder.query_trace import QueryTracer, TracingConnection, fingerprint
+from tutor.data import connection_profiles
+
+# The statements that read rows. Other statements, e.g. CREATE TABLE and PRAGMA, are not checked
+AUDITED_STATEMENTS = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+class QueryCollector(QueryTracer):
+    """
+    A QueryTracer that keeps the SQL of each different query, rather than the times of the most recent queries.
+
+    Attributes:
+        queries (dict): {fingerprint: SQL of the first query with the fingerprint}, in the order they were first made
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queries = {}
+
+    def finish(self, record):
+        self.add(record.sql)
+
+    def add(self, sql):
+        self.queries.setdefault(fingerprint(sql), sql)
+
+    def audited_queries(self):
+        """
+        Return the queries that read rows, e.g. not CREATE TABLE or INSERT ... VALUES.
+
+        A query without ? parameters is taken to read every row, e.g. to make a chart or a dictionary of ids.
+
+        Returns:
+            queries: list of (name, sql, reads every row), named by the start of their fingerprint
+        """
+        queries = []
+        for name, sql in self.queries.items():
+            statement = name.split(" ", 1)[0].upper()
+            if statement in AUDITED_STATEMENTS or (statement == "INSERT" and "SELECT" in name.upper()):
+                name = name if len(name) <= 100 else f"{name[:97]}..."
+                queries.append((name, sql, "?" not in sql))
+        return queries
+
+
+def dash_queries():
+    """Return the (name, sql, reads every row) of the queries made by the Dash app."""
+    # Imported here as the Dash modules are slow to import
+    from tutor.dash_single_t.data_store import CardIndex
+    from tutor.dash_single_t.figures import SCATTER_GEO_SQL
+
+    return [
+        ("card_index", CardIndex.sql, True),
+        ("scatter_geo", SCATTER_GEO_SQL, True),
+    ]
+
+
+def tracing_connection(collector):
+    """Return a connection to a new in-memory database that adds every query made on it to the collector."""
+    connection = sqlite3.connect(":memory:", factory=TracingConnection)
+    connection.tracer = collector
+    return connection
+
+
+def audit_database_queries():
+    """
+    Audit the queries of the sqlite3 loaders, sync_data and the line chart on a database created by create_db.
+
+    Returns:
+        flagged: list of the names of the queries with a flagged step
+    """
+    from student.placeholder import figures_sqlite3, sync_data
+    from student.placeholder.create_db import create_db
+
+    collector = QueryCollector()
+    # The loaders and sync print reports of the rows added, which are not needed here
+    with contextlib.redirect_stdout(io.StringIO()):
+        connection = tracing_connection(collector)
+        create_db(connection.cursor(), connection, bulk=False)
+        connection.close()
+        connection = tracing_connection(collector)
+        create_db(connection.cursor(), connection, bulk=True)
+        sync_data.sync_all_data(connection.cursor(), connection)
+    figures_sqlite3.line_chart("sports", connection)
+
+    # The queries are explained on the synced database, as it has the sync_fingerprint table
+    connection.tracer = None
+    flagged = audit(connection, collector.audited_queries())
+    connection.close()
+    return flagged
+
+
+def audit_orm_queries():
+    """
+    Audit the queries of the Flask-SQLAlchemy loaders in add_data, if it is installed.
+
+    The queries are explained on the database the bulk loader added the data to, as the models have columns that the
+    database created by create_db does not.
+
+    Returns:
+        flagged: list of the names of the queries with a flagged step
+    """
+    try:
+        from flask import Flask
+        from sqlalchemy import event
+
+        from student.placeholder import add_data
+    except ImportError:
+        print("  Flask-SQLAlchemy is not installed, the queries are not checked")
+        return []
+
+    collector = QueryCollector()
+
+    def add_query(conn, cursor, statement, parameters, context, executemany):
+        collector.add(statement)
+
+    flagged = []
+    for add_all_data in (add_data.add_all_data, add_data.add_all_data_bulk):
+        app = Flask(__name__)
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        add_data.db.init_app(app)
+        with app.app_context():
+            event.listen(add_data.db.engine, "before_cursor_execute", add_query)
+            add_data.db.create_all()
+            with contextlib.redirect_stdout(io.StringIO()):
+                add_all_data()
+            if add_all_data is add_data.add_all_data_bulk:
+                connection = add_data.db.session.connection().connection.driver_connection
+                flagged = audit(connection, collector.audited_queries())
+    return flagged
+
+
+def explain(connection, sql):
+    """Return the steps of the query plan as a list of strings. Any ? parameters are given NULL."""
+    plan = connection.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count("?")).fetchall()
+    return [row[-1] for row in plan]
+
+
+def flagged_steps(plan, reads_every_row):
+    """
+    Return the steps of the plan that read a whole table or build a temporary index.
+
+    Parameters:
+        plan: list of str  Steps from explain()
+        reads_every_row: bool  True if the query is meant to read every row, so the first table may be a SCAN
+
+    Returns:
+        flagged: list of str
+    """
+    flagged = []
+    first_table = True
+    for step in plan:
+        if "AUTOMATIC" in step:
+            flagged.append(step)
+        elif step.startswith("SCAN"):
+            # Reading the rows made by a subquery, e.g. for a window function, is not a scan of a table
+            if step.startswith(("SCAN (subquery", "SCAN CONSTANT ROW")):
+                continue
+            if not (reads_every_row and first_table):
+                flagged.append(step)
+            first_table = False
+    return flagged
+
+
+def audit(connection, queries):
+    """
+    Print the plan of each query with the flagged steps marked.
+
+    Parameters:
+        connection: sqlite3 connection to the database the queries are made on
+        queries: list of (name, sql, reads every row)
+
+    Returns:
+        flagged: list of the names of the queries with a flagged step
+    """
+    flagged_queries = []
+    for name, sql, reads_every_row in queries:
+        print(f"  {name}")
+        try:
+            plan = explain(connection, sql)
+        except sqlite3.Error as e:
+            print(f"      Could not explain the query. Error: {e}")
+            flagged_queries.append(name)
+            continue
+        flagged = flagged_steps(plan, reads_every_row)
+        for step in plan:
+            print(f"      {step}{'   <-- full table scan' if step in flagged else ''}")
+        if flagged:
+            flagged_queries.append(name)
+    return flagged_queries
+
+
+def main():
+    """Audit all the queries and return the number of flagged queries."""
+    flagged = []
+
+    db_path = resources.files("tutor.data").joinpath("paralympics.db")
+    print(f"Dash app queries on {db_path}")
+    connection = connection_profiles.connect(db_path, "immutable")
+    flagged += audit(connection, dash_queries())
+    connection.close()
+
+    print("Queries of the sqlite3 loaders, sync_data and the line chart on a database created by create_db")
+    flagged += audit_database_queries()
+
+    print("Queries of the Flask-SQLAlchemy loaders in add_data")
+    flagged += audit_orm_queries()
+
+    if flagged:
+        print(f"{len(flagged)} queries read a whole table: {', '.join(flagged)}")
+    else:
+        print("All queries use indexes")
+    return len(flagged)
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,252 @@
+"""
+Records how long the SQL queries made through get_db() take, in place of printing every query.
+
+For a sample of the queries, the time taken, number of rows returned and the route that made the query are stored in
+memory. Queries slower than a threshold also store the output of EXPLAIN QUERY PLAN. Queries are grouped by their
+"fingerprint", the SQL with any literal values replaced by ?, so the same query with different values is counted once.
+
+Settings in the Flask config:
+    QUERY_TRACE: True to record queries (default False)
+    QUERY_TRACE_SAMPLE_RATE: fraction of queries to record, between 0 and 1 (default 1.0)
+    QUERY_TRACE_SLOW_MS: queries that take longer than this many milliseconds also store the query plan (default 100)
+    QUERY_TRACE_BUFFER_SIZE: number of the most recent queries to keep (default 1000)
+
+When QUERY_TRACE is True the slowest and most recent queries can be viewed at /debug/queries?top=10
+"""
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import current_app, has_request_context, jsonify, request
+
+# Regular expressions used to replace literal values in SQL with ?
+_STRING_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Return the SQL with literal strings and numbers replaced by ? and the whitespace collapsed."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+class QueryRecord:
+    """A single traced query. rows and duration are added to as the rows are fetched."""
+
+    __slots__ = ("fingerprint", "sql", "route", "duration", "rows", "plan")
+
+    def __init__(self, sql, route):
+        self.fingerprint = fingerprint(sql)
+        self.sql = sql
+        self.route = route
+        self.duration = 0.0
+        self.rows = 0
+        self.plan = None
+
+    def to_dict(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "route": self.route,
+            "duration_ms": round(self.duration * 1000, 3),
+            "rows": self.rows,
+            "plan": self.plan,
+        }
+
+
+class QueryTracer:
+    """
+    Holds the most recent query records in a ring buffer, and totals for each fingerprint.
+
+    Attributes:
+        sample_rate (float): Fraction of queries to record
+        slow_seconds (float): Queries slower than this store their query plan
+        records (deque): The most recent QueryRecords
+        totals (dict): {fingerprint: {"count", "total_ms", "max_ms", "rows", "plan"}}
+    """
+
+    def __init__(self, sample_rate=1.0, slow_ms=100, buffer_size=1000):
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_ms / 1000
+        self.records = deque(maxlen=buffer_size)
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            sample_rate=config.get("QUERY_TRACE_SAMPLE_RATE", 1.0),
+            slow_ms=config.get("QUERY_TRACE_SLOW_MS", 100),
+            buffer_size=config.get("QUERY_TRACE_BUFFER_SIZE", 1000),
+        )
+
+    def start(self, sql):
+        """Return a new QueryRecord if this query is in the sample, otherwise None."""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        route = request.endpoint if has_request_context() else None
+        return QueryRecord(sql, route)
+
+    def finish(self, record):
+        """Add a completed record to the ring buffer and the totals."""
+        duration_ms = record.duration * 1000
+        with self._lock:
+            self.records.append(record)
+            total = self.totals.get(record.fingerprint)
+            if total is None:
+                total = self.totals[record.fingerprint] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                                                           "plan": None}
+            total["count"] += 1
+            total["total_ms"] += duration_ms
+            total["max_ms"] = max(total["max_ms"], duration_ms)
+            total["rows"] += record.rows
+            if record.plan is not None:
+                total["plan"] = record.plan
+
+    def recent(self, n=10):
+        """Return the n most recent query records, newest first."""
+        with self._lock:
+            records = list(self.records)[-n:]
+        return [record.to_dict() for record in reversed(records)]
+
+    def top(self, n=10):
+        """Return the n queries with the largest total time, slowest first."""
+        with self._lock:
+            items = [dict(fingerprint=fp, **total) for fp, total in self.totals.items()]
+        items.sort(key=lambda item: item["total_ms"], reverse=True)
+        return items[:n]
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor that times each query and counts the rows fetched. Used by TracingConnection."""
+
+    _record = None
+
+    def _finish(self):
+        if self._record is not None:
+            self.connection.tracer.finish(self._record)
+            self._record = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        tracer = self.connection.tracer
+        # The tracer is set after the connection is opened, so the PRAGMAs run when it is opened are not traced
+        record = None if tracer is None else tracer.start(sql)
+        if record is None:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        record.duration = time.perf_counter() - start
+        if record.duration > tracer.slow_seconds:
+            record.plan = explain(self.connection, sql, parameters)
+        if self.description is None:
+            # Not a SELECT, so there are no rows to fetch
+            record.rows = max(self.rowcount, 0)
+            tracer.finish(record)
+        else:
+            self._record = record
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        tracer = self.connection.tracer
+        record = None if tracer is None else tracer.start(sql)
+        if record is None:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        record.duration = time.perf_counter() - start
+        record.rows = max(self.rowcount, 0)
+        self.connection.tracer.finish(record)
+        return result
+
+    def _fetched(self, start, rows):
+        if self._record is not None:
+            self._record.duration += time.perf_counter() - start
+            self._record.rows += rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Records the query if the cursor is discarded before all the rows were fetched, e.g. execute().fetchone()
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class TracingConnection(sqlite3.Connection):
+    """Connection whose cursors are TracingCursors. Pass as factory= to sqlite3.connect and set the tracer attribute."""
+
+    tracer = None
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute calls the C execute of the cursor directly, so these are needed to trace the query
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def explain(connection, sql, parameters=()):
+    """Return the EXPLAIN QUERY PLAN output for a query as a list of strings, or None if it cannot be explained."""
+    try:
+        # A plain cursor so that the EXPLAIN is not traced
+        cursor = sqlite3.Cursor(connection)
+        return [row[-1] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()]
+    except sqlite3.Error:
+        return None
+
+
+def queries_view():
+    """Route that returns the queries with the largest total time and the most recent queries as JSON.
+
+    The number of queries in each list can be set with ?top=n
+    """
+    tracer = current_app.extensions["query_tracer"]
+    n = request.args.get("top", 10, type=int)
+    return jsonify({"top": tracer.top(n), "recent": tracer.recent(n)})
+
+
+def init_app(app):
+    """Create the tracer for the app if QUERY_TRACE is set in the config, and add the /debug/queries route."""
+    if not app.config.get("QUERY_TRACE", False):
+        return
+    app.extensions["query_tracer"] = QueryTracer.from_config(app.config)
+    app.add_url_rule("/debug/queries", "debug_queries", queries_view)
@@ -0,0 +1,192 @@
+"""
+Applies changes in paralympics.xlsx to an existing paralympics database, rather than recreating it with create_db.
+
+Each row of the source data is hashed, and the hashes are stored in the sync_fingerprint table keyed on the table name
+and the row's natural key, e.g. the year and type of an event. On the next sync only the rows whose hash has changed
+are updated, rows with a new key are inserted and rows whose key is no longer in the data are deleted. Inserts and
+updates use INSERT ... ON CONFLICT DO UPDATE so that the ids of existing rows do not change.
+
+All the changes are made in a single transaction, and a summary of the changes to each table is printed. The
+event_summary table is rebuilt if any of the tables it is made from have changed, see tutor.data.event_summary.
+
+The first sync of a database created by create_db has no stored hashes, so it writes every row once. Rows that were
+in the database before the first sync are only deleted if they have the same key as a row that is later removed.
+
+To sync a database created by create_db, run:
+python -m student.placeholder.sync_data path/to/paralympics.db
+"""
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+
+from student.placeholder.add_data_sql3 import (host_country_codes, host_event_rows, medal_event_id_map,
+                                              medal_result_rows, to_records)
+from tutor.data import connection_profiles
+from tutor.data.columnar import read_sheets
+from tutor.data.event_summary import rebuild_event_summary, table_columns
+from tutor.data.indexes import INDEX_SCHEMA
+
+# The table of row hashes, and the indexes which include the unique indexes needed for ON CONFLICT on the natural key
+# of each table
+SYNC_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS sync_fingerprint (
+        tbl TEXT NOT NULL,
+        row_key TEXT NOT NULL,
+        hash TEXT NOT NULL,
+        PRIMARY KEY (tbl, row_key))''',
+] + INDEX_SCHEMA
+
+
+def row_hash(row):
+    """Return the first 16 characters of the sha256 hash of the row's values."""
+    return hashlib.sha256(json.dumps(row, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def sync_table(cursor, table, key_columns, value_columns, rows):
+    """
+    Insert, update and delete rows of a table so that it matches the source rows.
+
+    Parameters:
+        cursor: sqlite cursor object
+        table: str  Name of the table
+        key_columns: list of the columns that identify a row, these must have a unique index
+        value_columns: list of the other columns
+        rows: list of tuples of the key values followed by the other values
+
+    Returns:
+        counts: tuple of the number of rows (inserted, updated, deleted, unchanged)
+    """
+    stored = dict(cursor.execute('SELECT row_key, hash FROM sync_fingerprint WHERE tbl = ?', (table,)))
+
+    source = {}
+    for row in rows:
+        source[json.dumps(list(row[:len(key_columns)]), default=str)] = (row, row_hash(row))
+    inserts = [(key, row, digest) for key, (row, digest) in source.items() if key not in stored]
+    updates = [(key, row, digest) for key, (row, digest) in source.items()
+               if key in stored and stored[key] != digest]
+    deletes = [key for key in stored if key not in source]
+
+    columns = key_columns + value_columns
+    sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))}) '
+    sql += f'ON CONFLICT ({", ".join(key_columns)}) '
+    if value_columns:
+        sql += 'DO UPDATE SET ' + ', '.join(f'{column} = excluded.{column}' for column in value_columns)
+    else:
+        sql += 'DO NOTHING'
+    cursor.executemany(sql, [row for _, row, _ in inserts + updates])
+
+    where = ' AND '.join(f'{column} = ?' for column in key_columns)
+    cursor.executemany(f'DELETE FROM {table} WHERE {where}', [json.loads(key) for key in deletes])
+
+    cursor.executemany(
+        'INSERT INTO sync_fingerprint (tbl, row_key, hash) VALUES (?, ?, ?) '
+        'ON CONFLICT (tbl, row_key) DO UPDATE SET hash = excluded.hash',
+        [(table, key, digest) for key, _, digest in inserts + updates])
+    cursor.executemany('DELETE FROM sync_fingerprint WHERE tbl = ? AND row_key = ?',
+                       [(table, key) for key in deletes])
+
+    unchanged = len(source) - len(inserts) - len(updates)
+    return len(inserts), len(updates), len(deletes), unchanged
+
+
+def print_sync_summary(summary, seconds):
+    """Print the number of rows inserted, updated, deleted and unchanged in each table."""
+    print(f'{"table":<18} {"inserted":>9} {"updated":>9} {"deleted":>9} {"unchanged":>10}')
+    for table, (inserted, updated, deleted, unchanged) in summary.items():
+        print(f'{table:<18} {inserted:>9} {updated:>9} {deleted:>9} {unchanged:>10}')
+    print(f'Synced in {seconds * 1000:.1f}ms')
+
+
+def sync_all_data(cursor, connection):
+    """Sync all the tables with the data in paralympics.xlsx, in a single transaction.
+
+    Parameters
+    ----------
+    cursor: sqlite cursor object
+    connection: sqlite connection object
+
+    Returns
+    -------
+    summary: dict of {table: (inserted, updated, deleted, unchanged)}, empty if the sync failed
+    """
+    sheets = read_sheets(['events', 'medal_standings', 'npc_codes'])
+    events_df = sheets['events']
+    medals_df = sheets['medal_standings']
+    npc_df = sheets['npc_codes']
+    events_df = events_df.assign(start=events_df['start'].dt.strftime('%d/%m/%Y'),
+                                 end=events_df['end'].dt.strftime('%d/%m/%Y'))
+
+    start = time.perf_counter()
+    summary = {}
+    try:
+        if not connection.in_transaction:
+            cursor.execute('BEGIN')
+        for sql in SYNC_SCHEMA:
+            cursor.execute(sql)
+
+        columns = ['name', 'region', 'sub_region', 'member_type', 'notes']
+        summary['country'] = sync_table(cursor, 'country', ['code'], columns,
+                                        to_records(npc_df, ['code'] + columns))
+
+        columns = ['start', 'end', 'countries', 'events', 'sports', 'highlights', 'url']
+        summary['event'] = sync_table(cursor, 'event', ['year', 'type'], columns,
+                                      to_records(events_df, ['year', 'type'] + columns))
+        event_ids = {(year, event_type): event_id for event_id, year, event_type in
+                     cursor.execute('SELECT event_id, year, type FROM event')}
+
+        columns = ['participants_m', 'participants_f', 'participants']
+        rows = [(event_ids[(year, event_type)], *values) for year, event_type, *values in
+                to_records(events_df, ['year', 'type'] + columns)]
+        summary['participants'] = sync_table(cursor, 'participants', ['event_id'], columns, rows)
+
+        host_countries = host_country_codes(events_df, npc_df)
+        summary['host'] = sync_table(cursor, 'host', ['host'], ['country_code'],
+                                     list(zip(host_countries['host'], host_countries['code'])))
+        host_ids = dict(cursor.execute('SELECT host, host_id FROM host'))
+
+        summary['host_event'] = sync_table(cursor, 'host_event', ['host_id', 'event_id'], [],
+                                           host_event_rows(events_df, event_ids, host_ids))
+
+        split_disabilities = events_df['disabilities'].str.split(', ')
+        categories = dict.fromkeys(d for disabilities in split_disabilities for d in disabilities)
+        summary['disability'] = sync_table(cursor, 'disability', ['category'], [], [(d,) for d in categories])
+        disability_ids = dict(cursor.execute('SELECT category, disability_id FROM disability'))
+
+        rows = [(disability_ids[d], event_ids[(year, event_type)])
+                for year, event_type, disabilities in zip(events_df['year'], events_df['type'], split_disabilities)
+                for d in disabilities]
+        summary['disability_event'] = sync_table(cursor, 'disability_event', ['disability_id', 'event_id'], [],
+                                                 rows)
+
+        summary['medal_result'] = sync_table(cursor, 'medal_result', ['event_id', 'country_code'],
+                                             ['rank', 'gold', 'silver', 'bronze', 'total'],
+                                             medal_result_rows(medals_df, medal_event_id_map(cursor)))
+
+        # Rebuild event_summary if any of the tables it is made from have changed (inserted, updated or deleted rows),
+        # or if the database was created before there was an event_summary table
+        changed = any(any(summary[table][:3]) for table in ['event', 'participants', 'host', 'host_event'])
+        if changed or not table_columns(cursor, 'event_summary'):
+            rows = rebuild_event_summary(cursor)
+            print(f'Rebuilt event_summary with {rows} rows')
+
+        connection.commit()
+
+    except sqlite3.Error as e:
+        print(f'An error occurred syncing the paralympics database. Error: {e}')
+        if connection:
+            connection.rollback()
+        return {}
+
+    print_sync_summary(summary, time.perf_counter() - start)
+    return summary
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python -m student.placeholder.sync_data path/to/paralympics.db')
+        sys.exit(1)
+    db_connection = connection_profiles.connect(sys.argv[1], 'write')
+    sync_all_data(db_connection.cursor(), db_connection)
+    db_connection.close()
@@ -0,0 +1,208 @@
+"""
+In-memory stores for the paralympics data used by the Dash figures.
+
+The events csv file is read once per process with explicit, compact dtypes. Figure functions then ask the store for the
+columns they need rather than calling pd.read_csv in every callback. The file is only re-read if it changes on disk,
+see tutor.data.versioned_file.
+
+The data for the event cards is read from the database once into a dictionary keyed on "Host Year", so that hovering
+over the map is a dictionary lookup rather than a database query. It is re-read if the database file changes.
+"""
+import os
+import threading
+from importlib import resources
+
+import pandas as pd
+
+from tutor.dash_single_t.db_pool import db_pool
+from tutor.dash_single_t.instrumentation import metrics
+from tutor.data.versioned_file import VersionedFile
+
+# Explicit dtypes avoid pandas having to infer the types, and use less memory than the int64/float64 defaults.
+# The participants columns can have missing values (e.g. participants_m for Rome 1960) so they are read as floats.
+EVENTS_DTYPES = {
+    "type": "category",
+    "year": "int16",
+    "country": "string",
+    "host": "string",
+    "countries": "int16",
+    "events": "int16",
+    "sports": "int16",
+    "participants_m": "float32",
+    "participants_f": "float32",
+    "participants": "float32",
+}
+
+
+class EventsStore:
+    """
+    Holds the events DataFrame for the lifetime of the process.
+
+    The file is checked using its modification time and size, which is cheap. Only if those change is the file
+    hashed, and only if the hash changes is the data re-read, see VersionedFile. The hash is used as the version of
+    the data.
+
+    Attributes:
+        path (str): Path to the csv file
+        version (str): Short hash of the file contents that the data was loaded from
+    """
+
+    def __init__(self, path, dtypes=None):
+        self.path = str(path)
+        self.dtypes = EVENTS_DTYPES if dtypes is None else dtypes
+        self._file = VersionedFile(self.path, self._read)
+        self._derived = {}
+
+    def _read(self, path):
+        return pd.read_csv(path, usecols=list(self.dtypes), dtype=self.dtypes)
+
+    @property
+    def version(self):
+        return self._file.version
+
+    def get(self, columns=None):
+        """
+        Return the events data, or a subset of the columns.
+
+        Selecting columns does not copy the data when pandas copy-on-write is enabled (the default from pandas 3).
+        The returned DataFrame should be treated as read-only; functions that add columns get their own copy.
+
+        Parameters:
+            columns: list of column names, or None for all columns
+
+        Returns:
+            df: pandas DataFrame
+        """
+        df = self._file.get()
+        if columns is None:
+            return df
+        return df[list(columns)]
+
+    def derived(self, name, func):
+        """
+        Return a table calculated from the events data, e.g. the male:female ratios for the bar charts.
+
+        func is only called once for each version of the data, the result is kept and returned on later calls.
+
+        Parameters:
+            name: str  Name to store the result under
+            func: function that takes the events DataFrame and returns the calculated table
+
+        Returns:
+            result: the value returned by func
+        """
+        df = self._file.get()
+        version = self.version
+        entry = self._derived.get(name)
+        if entry is None or entry[0] != version:
+            entry = (version, func(df))
+            self._derived[name] = entry
+        return entry[1]
+
+    def get_version(self):
+        """Return the version (short hash) of the data currently in the store."""
+        self._file.get()
+        return self.version
+
+
+# A single store that is shared by all the callbacks in the process
+events_store = EventsStore(resources.files("tutor.data").joinpath("paralympics.csv"))
+
+
+def get_events(columns=None):
+    """
+    Return the events data from the shared store.
+
+    Parameters:
+        columns: list of column names, or None for all columns
+
+    Returns:
+        df: pandas DataFrame
+    """
+    return events_store.get(columns)
+
+
+def get_derived(name, func):
+    """
+    Return a table calculated from the events data in the shared store, see EventsStore.derived.
+
+    Parameters:
+        name: str  Name to store the result under
+        func: function that takes the events DataFrame and returns the calculated table
+
+    Returns:
+        result: the value returned by func
+    """
+    return events_store.derived(name, func)
+
+
+def get_events_version():
+    """Return the version (short hash) of the events data in the shared store."""
+    return events_store.get_version()
+
+
+def get_database_version():
+    """
+    Return a value that changes when the SQLite database file changes.
+
+    Returns:
+        version: tuple of the file modification time and size
+    """
+    st = os.stat(db_pool.path)
+    return st.st_mtime_ns, st.st_size
+
+
+class CardIndex:
+    """
+    Index of the values shown on the event cards, keyed on the host and year e.g. "Sydney 2000".
+
+    The keys are the host_year labels of the event_summary table, which are also the hover text of the scatter_geo map.
+
+    Attributes:
+        version: database version (see get_database_version) that the index was built from
+    """
+
+    sql = "SELECT host_year, year, host, participants, events, countries, sports FROM event_summary"
+
+    def __init__(self):
+        self.version = None
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Build the index if it has not been built yet, or if the database has changed since it was built."""
+        version = get_database_version()
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            index = {}
+            with db_pool.connection() as conn, metrics.timer("db_query", "card_index"):
+                for host_year, year, host, participants, events, countries, sports in conn.execute(self.sql):
+                    index[host_year] = {
+                        "participants": participants,
+                        "events": events,
+                        "countries": countries,
+                        "sports": sports,
+                        "logo": f"logos/{year}_{host}.jpg",
+                    }
+            # Replace the whole dictionary so readers never see a partly built index
+            self._index = index
+            self.version = version
+
+    def get(self, host_year):
+        """
+        Return the card values for an event.
+
+        Parameters:
+            host_year: str  The host city name followed by a space then the year
+
+        Returns:
+            values: dict with participants, events, countries, sports and logo, or None if the event is not found
+        """
+        self.refresh()
+        return self._index.get(host_year)
+
+
+card_index = CardIndex()
@@ -0,0 +1,173 @@
+"""
+A small pool of SQLite connections for the Dash figures.
+
+Opening a connection for every callback, and not closing it, leaks file handles when many users hover over the map.
+The pool keeps a bounded number of connections open and hands them out to callbacks in turn.
+
+Connections are opened with a profile from tutor.data.connection_profiles. The shipped paralympics.db is opened with
+the immutable profile, so SQLite does not lock the file for each read. As an immutable connection does not notice if the
+file is replaced, the pool closes its idle connections when the file's modified time or size changes.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from importlib import resources
+
+from tutor.data import connection_profiles
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of sqlite3 connections.
+
+    Connections are created when needed up to max_size. A connection that has been idle in the pool for longer than
+    max_idle seconds is closed rather than reused. If all connections are in use, callers wait up to timeout seconds.
+
+    Attributes:
+        path (str): Path to the database file
+        max_size (int): Maximum number of open connections
+        max_idle (float): Seconds a connection can be idle before it is closed
+        timeout (float): Seconds to wait for a free connection before raising PoolTimeout
+        profile (str): Name of the connection profile, see tutor.data.connection_profiles
+    """
+
+    def __init__(self, path, max_size=5, max_idle=300, timeout=10, profile="immutable"):
+        self.path = str(path)
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.profile = profile
+        self._file_version = None
+        self._idle = deque()  # (connection, time it was returned)
+        self._conn_versions = {}  # {connection: file version it was opened on}
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._metrics = {
+            "created": 0,
+            "closed_idle": 0,
+            "checkouts": 0,
+            "returns": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def _connect(self):
+        # Callbacks run in the server's worker threads, so a connection may be returned by a different thread
+        conn = connection_profiles.connect(self.path, self.profile, check_same_thread=False)
+        self._conn_versions[conn] = self._file_version
+        self._metrics["created"] += 1
+        return conn
+
+    def _close(self, conn):
+        """Close a connection and forget its file version. Called with the lock held."""
+        self._conn_versions.pop(conn, None)
+        conn.close()
+
+    def _close_if_file_changed(self):
+        """
+        Close the idle connections if the database file has changed. Called with the lock held.
+
+        Connections that are in use are closed when they are released, see release().
+        """
+        st = os.stat(self.path)
+        version = (st.st_mtime_ns, st.st_size)
+        if version != self._file_version:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._close(conn)
+            self._file_version = version
+
+    def _close_expired(self, now):
+        """Close connections that have been idle for longer than max_idle. Called with the lock held."""
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            conn, _ = self._idle.popleft()
+            self._close(conn)
+            self._metrics["closed_idle"] += 1
+
+    def acquire(self):
+        """
+        Take a connection from the pool, opening a new one if none are idle and the pool is not full.
+
+        Returns:
+            conn: sqlite3.Connection
+
+        Raises:
+            PoolTimeout: if no connection is free within the timeout
+        """
+        start = time.perf_counter()
+        with self._cond:
+            self._close_if_file_changed()
+            while True:
+                self._close_expired(time.monotonic())
+                if self._idle:
+                    # Most recently returned first, so the older connections are left to expire
+                    conn, _ = self._idle.pop()
+                    break
+                if self._in_use < self.max_size:
+                    conn = self._connect()
+                    break
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self._metrics["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout} seconds")
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._metrics["checkouts"] += 1
+            waited = time.perf_counter() - start
+            self._metrics["wait_seconds_total"] += waited
+            self._metrics["wait_seconds_max"] = max(self._metrics["wait_seconds_max"], waited)
+            return conn
+
+    def release(self, conn):
+        """
+        Return a connection to the pool. Any open transaction is rolled back.
+
+        A connection opened on an earlier version of the database file is closed rather than returned, as an immutable
+        connection would keep reading the old file.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            self._in_use -= 1
+            self._metrics["returns"] += 1
+            self._close_if_file_changed()
+            if self._conn_versions.get(conn) == self._file_version:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._close(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that acquires a connection and returns it to the pool afterwards."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close the idle connections, e.g. when the app shuts down. Connections that are in use are not affected."""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._close(conn)
+
+    def stats(self):
+        """Return a dictionary of the pool size, checkout/return counts and wait times."""
+        with self._cond:
+            stats = dict(self._metrics)
+            stats["in_use"] = self._in_use
+            stats["idle"] = len(self._idle)
+            stats["max_size"] = self.max_size
+            return stats
+
+
+db_pool = ConnectionPool(resources.files("tutor.data").joinpath("paralympics.db"))
@@ -0,0 +1,114 @@
+"""
+Cache for the figures and cards created by the functions in figures.py.
+
+The chart functions only have a few possible inputs, so once a figure has been created for an input it can be kept and
+returned again rather than running pandas and Plotly Express each time a callback is triggered.
+
+Entries are keyed on (function name, arguments, data version) so a change to the data creates new entries, and the old
+entries are evicted as the least recently used.
+"""
+import functools
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.graph_objects as go
+
+from tutor.dash_single_t.instrumentation import metrics
+
+
+class FigureCache:
+    """
+    A bounded least recently used (LRU) cache.
+
+    Attributes:
+        maxsize (int): Maximum number of entries held before the least recently used is evicted
+        hits (int): Number of lookups that found an entry
+        misses (int): Number of lookups that did not find an entry
+        evictions (int): Number of entries removed to keep the cache within maxsize
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value for the key, or None if it is not in the cache."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Add the value to the cache, evicting the least recently used entries if the cache is full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return a dictionary with the size of the cache and the hit, miss and eviction counts."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+figure_cache = FigureCache()
+
+
+def cached(builder, version, cache=None):
+    """
+    Wrap a figure function so that its results are cached.
+
+    Plotly figures are stored as JSON and returned as a dictionary, which dcc.Graph accepts in place of a Figure
+    object. Converting the JSON back to a go.Figure would validate every property again and take longer than the
+    cache saves. Any other result (e.g. a dbc.Card) is stored and returned as it is.
+
+    Parameters:
+        builder: function that creates the figure
+        version: function with no arguments that returns the current version of the data used by the builder
+        cache: FigureCache to use, defaults to the shared figure_cache
+
+    Returns:
+        wrapper: function that takes the same arguments as the builder
+    """
+
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        fig_cache = figure_cache if cache is None else cache
+        key = (builder.__qualname__, args, tuple(sorted(kwargs.items())), version())
+        value = fig_cache.get(key)
+        if value is None:
+            with metrics.timer("figure", builder.__name__):
+                value = builder(*args, **kwargs)
+            if isinstance(value, go.Figure):
+                value = value.to_json()
+            fig_cache.put(key, value)
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+    return wrapper
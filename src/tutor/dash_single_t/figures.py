@@ -1,4 +1,3 @@
-import sqlite3
 from importlib import resources
 
 import dash
@@ -7,20 +6,27 @@ import pandas as pd
 import plotly.express as px
 from dash import html
 
+from tutor.dash_single_t.data_store import card_index, get_database_version, get_derived, get_events, \
+    get_events_version
+from tutor.dash_single_t.db_pool import db_pool
+from tutor.dash_single_t.figure_cache import cached
+from tutor.dash_single_t.instrumentation import metrics
+from tutor.data import connection_profiles
+
 
 def get_database_connection():
     """
     Create a connection to the SQLite database.
 
+    The figures in this file use connections from db_pool instead, so that connections are reused and closed.
+
     Returns:
-    conn: sqlite3.Connection object
+    conn: sqlite3.Connection object, opened with the read-only immutable profile
     """
     path_db = resources.files("tutor.data").joinpath("paralympics.db")
-    conn = sqlite3.connect(str(path_db))
-    with conn:
-        conn.execute("PRAGMA foreign_keys = ON")
-        # conn.set_trace_callback(print)
-        return conn
+    conn = connection_profiles.connect(path_db, "immutable")
+    # conn.set_trace_callback(print)
+    return conn
 
 
 def create_line_chart(feature):
@@ -44,10 +50,9 @@ def create_line_chart(feature):
         # Make sure it is lowercase to match the dataframe column names
         feature = feature.lower()
 
-    # Read the data from .csv into a DataFrame
+    # Get the columns from the events data, which is read from paralympics.csv once and kept in memory
     cols = ["type", "year", "host", feature]
-    csv_path = resources.files("tutor.data").joinpath("paralympics.csv")
-    line_chart_data = pd.read_csv(str(csv_path), usecols=cols)
+    line_chart_data = get_events(cols)
 
     # Create a Plotly Express line chart with the following parameters
     #  line_chart_data is the DataFrame
@@ -66,35 +71,73 @@ def create_line_chart(feature):
     return fig
 
 
-def create_bar_chart(event_type):
+def create_line_chart_store():
     """
-    Creates a stacked bar chart showing change in the ratio of male and female competitors in the summer and winter paralympics.
+    Creates the data for all four line charts to send to the browser in a dcc.Store.
+
+    Used when the line chart is updated by a clientside callback. The layout (mostly the template) is the same for every
+    feature so it is only sent once, with the traces and titles for each feature.
+
+     Returns
+     store: dict with the shared "layout" and a "features" dict of data, title and y-axis title for each feature
+     """
+    store = {"layout": None, "features": {}}
+    for feature in ["events", "sports", "countries", "participants"]:
+        fig = cached_line_chart(feature)
+        if store["layout"] is None:
+            store["layout"] = fig["layout"]
+        store["features"][feature] = {
+            "data": fig["data"],
+            "title": fig["layout"]["title"]["text"],
+            "yaxis_title": fig["layout"]["yaxis"]["title"]["text"],
+        }
+    return store
+
+
+def prepare_bar_chart_data(df_events):
+    """
+    Calculates the ratio of male and female competitors for both the summer and winter paralympics.
+
+    The calculation is done once for all events. The bar charts then select the rows for their event type.
 
     Parameters
-    event_type: str Winter or Summer
+    df_events: DataFrame with the type, year, host, participants_m, participants_f and participants columns
 
     Returns
-    fig: Plotly Express bar chart
+    df: DataFrame with additional Male, Female and xlabel columns, sorted by type and year
     """
-    cols = ['type', 'year', 'host', 'participants_m', 'participants_f', 'participants']
-    csv_path = resources.files("tutor.data").joinpath("paralympics.csv")
-    df_events = pd.read_csv(str(csv_path), usecols=cols)
     # Drop Rome as there is no male/female data
     # Drop rows where male/female data is missing
-    df_events = df_events.dropna(subset=['participants_m', 'participants_f'])
-    df_events.reset_index(drop=True, inplace=True)
+    df = df_events.dropna(subset=['participants_m', 'participants_f'])
 
     # Add new columns that each contain the result of calculating the % of male and female participants
-    df_events['Male'] = df_events['participants_m'] / df_events['participants']
-    df_events['Female'] = df_events['participants_f'] / df_events['participants']
+    # and a column that combines Location and Year to use as the x-axis
+    df = df.assign(
+        Male=df['participants_m'] / df['participants'],
+        Female=df['participants_f'] / df['participants'],
+        xlabel=df['host'] + ' ' + df['year'].astype(str),
+    )
 
     # Sort the values by Type and Year
-    df_events.sort_values(['type', 'year'], ascending=(True, True), inplace=True)
-    # Create a new column that combines Location and Year to use as the x-axis
-    df_events['xlabel'] = df_events['host'] + ' ' + df_events['year'].astype(str)
+    return df.sort_values(['type', 'year'], ascending=(True, True), ignore_index=True)
+
+
+def create_bar_chart(event_type):
+    """
+    Creates a stacked bar chart showing change in the ratio of male and female competitors in the summer and winter paralympics.
+
+    Parameters
+    event_type: str Winter or Summer
+
+    Returns
+    fig: Plotly Express bar chart
+    """
+    # The ratios for all events are calculated once for each version of the data and shared by both event types
+    cols = ['type', 'year', 'host', 'participants_m', 'participants_f', 'participants']
+    df_ratios = get_derived('bar_chart', lambda df: prepare_bar_chart_data(df[cols]))
 
     # Create the stacked bar plot of the % for male and female
-    df_events = df_events.loc[df_events['type'] == event_type]
+    df_events = df_ratios.loc[df_ratios['type'] == event_type]
     fig = px.bar(df_events,
                  x='xlabel',
                  y=['Male', 'Female'],
@@ -107,28 +150,22 @@ def create_bar_chart(event_type):
     return fig
 
 
+# The query for create_scatter_geo, also checked by python -m student.placeholder.query_audit
+# event_summary has the coordinates as REAL and the "Host Year" label for the hover text, see tutor.data.event_summary
+SCATTER_GEO_SQL = 'SELECT host_year, latitude, longitude FROM event_summary'
+
+
 def create_scatter_geo():
-    # create database connection using the get_database_connection function in this file
-    connection = get_database_connection()
-
-    # define the sql query
-    sql = '''
-        SELECT event.year, host.host, host.latitude, host.longitude FROM event
-        JOIN host_event ON event.event_id = host_event.event_id
-        JOIN host on host_event.host_id = host.host_id
-        '''
-
-    df_locs = pd.read_sql(sql=sql, con=connection, index_col=None)
-    # The lat and lon are stored as string but need to be floats for the scatter_geo
-    df_locs['longitude'] = df_locs['longitude'].astype(float)
-    df_locs['latitude'] = df_locs['latitude'].astype(float)
-    # Adds a new column that concatenates the city and year e.g. Barcelona 2012
-    df_locs['name'] = df_locs['host'] + ' ' + df_locs['year'].astype(str)
+    sql = SCATTER_GEO_SQL
+
+    # use a connection from the pool, it is returned to the pool (not closed) at the end of the with block
+    with db_pool.connection() as connection, metrics.timer("db_query", "scatter_geo"):
+        df_locs = pd.read_sql(sql=sql, con=connection, index_col=None)
 
     fig = px.scatter_geo(df_locs,
                          lat=df_locs.latitude,
                          lon=df_locs.longitude,
-                         hover_name=df_locs.name,
+                         hover_name=df_locs.host_year,
                          title="Where have the paralympics been held?",
                          )
     return fig
@@ -144,36 +181,37 @@ def create_card(host_year):
     Returns:
         card: dash boostrap components card for the event
     """
-    # Access substrings to get the year and host as separate values.
-    # The last 4 digits are the year, the 5th from last is a space, and the rest is the host
-    year = host_year[-4:]
-    host = host_year[:-5]
-
-    # Read the data into a DataFrame using a database query
-    conn = get_database_connection()
-    with conn:
-        query = "SELECT * FROM event JOIN  host_event ON event.event_id = host_event.event_id JOIN host ON host_event.host_id = host.host_id WHERE event.year = ? AND host.host = ?;"
-        ev = pd.read_sql_query(query, conn, params=[year, host])
-        if ev.empty:
-            return dbc.Alert("Event not found", color="danger")
-
-        # Variables for the card contents
-        logo = f'logos/{year}_{host}.jpg'
-        participants = f'{ev['participants'].item()} athletes'
-        events = f'{ev['events'].item()} events'
-        countries = f'{ev['countries'].item()} participating teams'
-        sports = f'{ev['sports'].item()} sports'
-
-        card = dbc.Card([
-            dbc.CardImg(src=dash.get_asset_url(logo), style={'max-width': '60px'}, top=True),
-            dbc.CardBody([
-                html.H4(host_year, className="card-title", id='card-title'),
-                html.P(participants, className="card-text", ),
-                html.P(events, className="card-text", ),
-                html.P(countries, className="card-text", ),
-                html.P(sports, className="card-text", ),
-            ]),
-        ],
-            style={"width": "18rem"},
-        )
-        return card
+    # Look up the values for the event in the card index, which is built from the database once rather than
+    # querying the database each time the card is updated
+    ev = card_index.get(host_year)
+    if ev is None:
+        return dbc.Alert("Event not found", color="danger")
+
+    # Variables for the card contents
+    logo = ev['logo']
+    participants = f"{ev['participants']} athletes"
+    events = f"{ev['events']} events"
+    countries = f"{ev['countries']} participating teams"
+    sports = f"{ev['sports']} sports"
+
+    card = dbc.Card([
+        dbc.CardImg(src=dash.get_asset_url(logo), style={'max-width': '60px'}, top=True),
+        dbc.CardBody([
+            html.H4(host_year, className="card-title", id='card-title'),
+            html.P(participants, className="card-text", ),
+            html.P(events, className="card-text", ),
+            html.P(countries, className="card-text", ),
+            html.P(sports, className="card-text", ),
+        ]),
+    ],
+        style={"width": "18rem"},
+    )
+    return card
+
+
+# Cached versions of the functions for use in the app callbacks.
+# The figures are returned as dictionaries (Plotly JSON) which dcc.Graph accepts, see figure_cache.cached.
+cached_line_chart = cached(create_line_chart, version=get_events_version)
+cached_bar_chart = cached(create_bar_chart, version=get_events_version)
+cached_scatter_geo = cached(create_scatter_geo, version=get_database_version)
+cached_card = cached(create_card, version=get_database_version)
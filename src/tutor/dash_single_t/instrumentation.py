@@ -0,0 +1,177 @@
+"""
+Optional timing of the Dash callbacks, figure functions and database queries.
+
+Call instrument_app(app) after the callbacks have been registered to record, for every callback, a histogram of how long
+it takes, the number of calls and errors, and the size of the responses. The figure functions and database queries
+are timed separately. The metrics are served in the Prometheus text format from /metrics on the app's Flask server.
+
+Nothing is recorded unless instrument_app has been called.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from dash.exceptions import PreventUpdate
+from flask import Response
+
+# Upper bounds of the histogram buckets in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Metric name and description for each type of histogram
+HISTOGRAMS = {
+    "callback": ("dash_callback_duration_seconds", "Time taken by the Dash callback"),
+    "figure": ("dash_figure_build_duration_seconds", "Time taken to create a figure when it is not in the cache"),
+    "db_query": ("dash_db_query_duration_seconds", "Time taken by the database query"),
+}
+
+# Metric name and description for each type of counter
+COUNTERS = {
+    "errors": ("dash_callback_errors_total", "Number of callbacks that raised an exception"),
+    "response_bytes": ("dash_callback_response_bytes_total", "Total size of the callback responses"),
+}
+
+
+class Histogram:
+    """Counts of observed values in cumulative buckets, with their sum and count."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Registry of the histograms and counters, keyed on the type of metric and a label e.g. the callback name.
+
+    Attributes:
+        enabled (bool): Values are only recorded when this is True
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, kind, label, seconds):
+        """Add a time in seconds to the histogram for the kind (callback, figure or db_query) and label."""
+        with self._lock:
+            histogram = self.histograms.get((kind, label))
+            if histogram is None:
+                histogram = self.histograms[(kind, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, kind, label, amount=1):
+        """Increase the counter for the kind (errors or response_bytes) and label."""
+        with self._lock:
+            self.counters[(kind, label)] = self.counters.get((kind, label), 0) + amount
+
+    @contextmanager
+    def timer(self, kind, label):
+        """Context manager that records how long the code in the with block takes."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, label, time.perf_counter() - start)
+
+    def render(self, gauges=None):
+        """
+        Return the metrics in the Prometheus text format.
+
+        Parameters:
+            gauges: dict of {name: {label: value}} for other values to include, e.g. the figure cache size
+
+        Returns:
+            text: str
+        """
+        lines = []
+        with self._lock:
+            for kind, (name, description) in HISTOGRAMS.items():
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+                for (hist_kind, label), h in sorted(self.histograms.items()):
+                    if hist_kind != kind:
+                        continue
+                    for upper, count in zip(h.buckets, h.counts):
+                        lines.append(f'{name}_bucket{{name="{label}",le="{upper}"}} {count}')
+                    lines.append(f'{name}_bucket{{name="{label}",le="+Inf"}} {h.count}')
+                    lines.append(f'{name}_sum{{name="{label}"}} {h.sum}')
+                    lines.append(f'{name}_count{{name="{label}"}} {h.count}')
+            for kind, (name, description) in COUNTERS.items():
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+                for (counter_kind, label), value in sorted(self.counters.items()):
+                    if counter_kind == kind:
+                        lines.append(f'{name}{{name="{label}"}} {value}')
+        for name, values in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            for label, value in values.items():
+                lines.append(f'{name}{{name="{label}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def instrument_callback(func, name):
+    """Wrap the function that Dash calls for a callback so that its time, errors and response size are recorded."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            metrics.inc("errors", name)
+            raise
+        finally:
+            metrics.observe("callback", name, time.perf_counter() - start)
+        # Dash returns the response already converted to JSON
+        if isinstance(response, (str, bytes)):
+            metrics.inc("response_bytes", name, len(response))
+        return response
+
+    return wrapper
+
+
+def instrument_app(app, path="/metrics"):
+    """
+    Record metrics for every callback registered with the app, and serve them from a route on the Flask server.
+
+    Call this after the callbacks have been registered.
+
+    Parameters:
+        app: Dash app
+        path: str  URL of the metrics route
+    """
+    # Imported here to avoid a circular import, as figure_cache.py and data_store.py import this module
+    from tutor.dash_single_t.db_pool import db_pool
+    from tutor.dash_single_t.figure_cache import figure_cache
+
+    metrics.enabled = True
+    for entry in app.callback_map.values():
+        if "callback" in entry:
+            entry["callback"] = instrument_callback(entry["callback"], entry["callback"].__name__)
+
+    def metrics_view():
+        gauges = {
+            "dash_figure_cache": figure_cache.stats(),
+            "dash_db_pool": db_pool.stats(),
+        }
+        return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+    app.server.add_url_rule(path, "metrics", metrics_view)
@@ -1,18 +1,66 @@
 """ Version as at the end of week 3: Charts with callbacks"""
+import threading
+import time
+
+# Used to time how long the app takes to start, see print_startup_timings
+startup_start = time.perf_counter()
+
+from concurrent.futures import ThreadPoolExecutor
+
 import dash_bootstrap_components as dbc
 from dash import Dash, Input, Output, dcc, html
 
-from tutor.dash_single_t.figures import create_bar_chart, create_card, create_line_chart, create_scatter_geo
+from tutor.dash_single_t.data_store import card_index, get_events
+from tutor.dash_single_t.figures import cached_bar_chart, cached_card, cached_line_chart, cached_scatter_geo, \
+    create_line_chart_store
+from tutor.dash_single_t.instrumentation import instrument_app
+
+# If True, the data for all the line charts is sent to the browser once and the chart is changed in the browser when the
+# dropdown changes, without a request to the server. If False, the chart is changed by the update_line_chart callback.
+CLIENTSIDE_LINE_CHART = False
+
+# How the figures in the layout are created when the app starts:
+#  "eager" creates them before the server starts, so the first page load is fast but starting is slow
+#  "lazy" creates them when the first page is requested, so the server starts quickly
+#  "background" starts quickly like "lazy", and creates the figures in background threads ready for the first request
+STARTUP_MODE = "eager"
+
+# If True, the time taken by each callback, figure and database query is recorded and can be viewed at /metrics
+INSTRUMENT_CALLBACKS = False
+
+startup_timings = {"import": time.perf_counter() - startup_start}
 
 meta_tags = [{"name": "viewport", "content": "width=device-width, initial-scale=1"}, ]
 external_stylesheets = [dbc.themes.BOOTSTRAP]
 app = Dash(__name__, external_stylesheets=external_stylesheets, meta_tags=meta_tags)
 
-# Create the figure (chart) variables
-fig_line = create_line_chart("sports")
-fig_bar = create_bar_chart("winter")
-map = create_scatter_geo()
-card = create_card("Sydney 2000")
+
+def load_data():
+    """ Load the events data and the card index into memory """
+    get_events()
+    card_index.refresh()
+
+
+def warm_figures():
+    """ Create the figures used in the layout in a pool of threads so that they are in the figure cache """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(cached_line_chart, "sports"),
+            executor.submit(cached_bar_chart, "summer"),
+            executor.submit(cached_scatter_geo),
+            executor.submit(cached_card, "Sydney 2000"),
+        ]
+        for future in futures:
+            future.result()
+    startup_timings["figure build"] = time.perf_counter() - start
+
+
+def print_startup_timings():
+    """ Print how long each stage of starting the app took """
+    parts = ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in startup_timings.items())
+    print(f"Startup ({STARTUP_MODE}): {parts}")
+
 
 # Variables that define each row that will be added to the layout
 row_one = dbc.Row([
@@ -32,7 +80,7 @@ row_two = dbc.Row([
                 {"label": "Countries", "value": "countries"},
                 {"label": "Athletes", "value": "participants"},
             ],
-            value="events"
+            value="sports"
         )], width=4),
     dbc.Col(children=[
         dbc.Checklist(
@@ -46,34 +94,97 @@ row_two = dbc.Row([
     ], width={"size": 4, "offset": 2}),
 ])
 
-row_three = dbc.Row([
-    dbc.Col(children=[dcc.Graph(id="line-chart", figure=fig_line), ], width=6),
-    dbc.Col(children=[], id='bar-div', width=6),
-], align="start")
-
-row_four = dbc.Row([
-    dbc.Col(children=[dcc.Graph(id='map', figure=map)], width=8),
-    dbc.Col(children=[card], id='card', width=4),
-], align="start")
-
-app.layout = dbc.Container([
-    row_one,
-    row_two,
-    row_three,
-    row_four
-])
+
+def create_layout(placeholders=False):
+    """ Create the layout including the figures.
+
+    The figures come from the figure cache, so they are only created the first time this is called.
+
+    Parameters:
+        placeholders: bool  If True the layout has the same components but empty figures, which is quick to create
+    """
+    if placeholders:
+        fig_line, fig_map, card = {}, {}, None
+    else:
+        fig_line, fig_map, card = cached_line_chart("sports"), cached_scatter_geo(), cached_card("Sydney 2000")
+
+    line_chart_children = [dcc.Graph(id="line-chart", figure=fig_line), ]
+    if CLIENTSIDE_LINE_CHART:
+        store_data = None if placeholders else create_line_chart_store()
+        line_chart_children.append(dcc.Store(id="line-chart-store", data=store_data))
+
+    row_three = dbc.Row([
+        dbc.Col(children=line_chart_children, width=6),
+        dbc.Col(children=[], id='bar-div', width=6),
+    ], align="start")
+
+    row_four = dbc.Row([
+        dbc.Col(children=[dcc.Graph(id='map', figure=fig_map)], width=8),
+        dbc.Col(children=[card], id='card', width=4),
+    ], align="start")
+
+    return dbc.Container([
+        row_one,
+        row_two,
+        row_three,
+        row_four
+    ])
+
+
+if STARTUP_MODE == "eager":
+    start = time.perf_counter()
+    load_data()
+    startup_timings["data load"] = time.perf_counter() - start
+    start = time.perf_counter()
+    app.layout = create_layout()
+    startup_timings["figure build"] = time.perf_counter() - start
+else:
+    # Dash calls the layout function for each page load. Dash also calls it when it is set to check the component ids
+    # used in the callbacks, unless validation_layout is already set, so set that to a layout without the figures.
+    app.validation_layout = create_layout(placeholders=True)
+    app.layout = create_layout
+    if STARTUP_MODE == "background":
+        start = time.perf_counter()
+        load_data()
+        startup_timings["data load"] = time.perf_counter() - start
+        threading.Thread(target=warm_figures, daemon=True).start()
 
 
-@app.callback(
-    Output(component_id='line-chart', component_property='figure'),
-    Input(component_id='dropdown-category', component_property='value')
-)
 def update_line_chart(feature):
     """ Update the line chart based on the dropdown selection """
-    figure = create_line_chart(feature)
+    figure = cached_line_chart(feature)
     return figure
 
 
+# JavaScript function that returns the figure for the selected feature using the data in the dcc.Store
+select_line_chart_js = """
+function(feature, store) {
+    if (!store) {
+        return window.dash_clientside.no_update;
+    }
+    const series = store.features[feature];
+    const layout = Object.assign({}, store.layout, {
+        title: Object.assign({}, store.layout.title, {text: series.title}),
+        yaxis: Object.assign({}, store.layout.yaxis, {title: {text: series.yaxis_title}})
+    });
+    return {data: series.data, layout: layout};
+}
+"""
+
+if CLIENTSIDE_LINE_CHART:
+    app.clientside_callback(
+        select_line_chart_js,
+        Output(component_id='line-chart', component_property='figure'),
+        Input(component_id='dropdown-category', component_property='value'),
+        Input(component_id='line-chart-store', component_property='data'),
+    )
+else:
+    app.callback(
+        Output(component_id='line-chart', component_property='figure'),
+        Input(component_id='dropdown-category', component_property='value')
+    )(update_line_chart)
+
+
 # This version removes the original bar chart component from the layout and treats the Col as the Output
 @app.callback(
     Output(component_id='bar-div', component_property='children'),
@@ -86,7 +197,7 @@ def update_bar_chart(selected_values):
     figures = []
     # Iterate the list of values from the checkbox component
     for value in selected_values:
-        fig = create_bar_chart(value)
+        fig = cached_bar_chart(value)
         # Assign id to be used to identify the charts
         id = f"bar-chart-{value}"
         element = dcc.Graph(figure=fig, id=id)
@@ -102,8 +213,13 @@ def display_card(hover_data):
     """ Display a card with information about the selected country on the map """
     if hover_data is not None:
         text = hover_data['points'][0]['hovertext']
-        return create_card(text)
+        return cached_card(text)
+
 
+if INSTRUMENT_CALLBACKS:
+    # This must be after the callbacks have been registered
+    instrument_app(app)
 
 if __name__ == '__main__':
+    print_startup_timings()
     app.run(debug=True)
@@ -0,0 +1,171 @@
+"""
+Converts the sheets in paralympics.xlsx to Arrow IPC (Feather v2) files and reads them back.
+
+Parsing the Excel file with openpyxl is slow. The Arrow files store each column already typed, and because they are
+written uncompressed they can be memory-mapped and read without copying or parsing. Only the columns asked for are read.
+
+`pip install pyarrow` is required to convert or read the Arrow files. If pyarrow is not installed, or a sheet has not
+been converted, read_sheet reads the Excel file instead.
+
+To convert the files for both the tutor and student data packages, run:
+python -m tutor.data.columnar
+
+read_sheets and iter_record_batches read several sheets at once. When the Arrow files have not been created, the
+workbook is opened once in openpyxl's read-only mode, which streams the rows of each sheet rather than loading the
+whole workbook. The sheets are parsed in this process: they take tens of milliseconds each, less than starting a
+process to parse them in, see test_read_sheets_excel in tests/benchmarks.
+"""
+from importlib import resources
+
+import openpyxl
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+SHEETS = ["events", "medal_standings", "npc_codes"]
+PACKAGES = ["tutor.data", "student.data"]
+
+# Text that pd.read_excel reads as missing by default, from the na_values parameter in the pandas.read_excel docs
+NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA",
+    "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+
+def arrow_path(sheet_name, package="tutor.data"):
+    """Return the path of the Arrow file for a sheet e.g. paralympics_events.arrow"""
+    return resources.files(package).joinpath(f"paralympics_{sheet_name}.arrow")
+
+
+def convert_excel(package="tutor.data"):
+    """
+    Write each sheet of paralympics.xlsx in the data package to an Arrow file.
+
+    Parameters:
+        package: str  Name of the data package, e.g. tutor.data or student.data
+
+    Returns:
+        paths: list of the Arrow files written
+    """
+    if feather is None:
+        raise ImportError("pyarrow is required to convert the data, run `pip install pyarrow`")
+    excel_path = resources.files(package).joinpath("paralympics.xlsx")
+    # Read all the sheets with a single parse of the workbook
+    sheets = pd.read_excel(excel_path, sheet_name=SHEETS)
+    paths = []
+    for sheet_name, df in sheets.items():
+        path = arrow_path(sheet_name, package)
+        # Uncompressed so that the file can be memory-mapped
+        feather.write_feather(df, str(path), compression="uncompressed")
+        paths.append(path)
+    return paths
+
+
+def read_sheet(sheet_name, package="tutor.data", columns=None):
+    """
+    Read a sheet of the paralympics data into a DataFrame.
+
+    Uses the Arrow file if it exists and is newer than the Excel file, otherwise reads the Excel file.
+
+    Parameters:
+        sheet_name: str  events, medal_standings or npc_codes
+        package: str  Name of the data package, e.g. tutor.data or student.data
+        columns: list of column names to read, or None for all columns
+
+    Returns:
+        df: pandas DataFrame
+    """
+    excel_path = resources.files(package).joinpath("paralympics.xlsx")
+    path = arrow_path(sheet_name, package)
+    if feather is not None and path.is_file() and path.stat().st_mtime >= excel_path.stat().st_mtime:
+        return feather.read_feather(str(path), columns=columns, memory_map=True)
+    return pd.read_excel(excel_path, sheet_name=sheet_name, usecols=columns)
+
+
+def parse_sheet(workbook, sheet_name):
+    """
+    Read the rows of one sheet of an Excel workbook.
+
+    Parameters:
+        workbook: openpyxl Workbook, opened with read_only=True and data_only=True
+        sheet_name: str  Name of the sheet
+
+    Returns:
+        columns: list of the column names from the first row
+        rows: list of tuples of the cell values, with empty cells as None. Empty rows are not included.
+    """
+    rows = workbook[sheet_name].iter_rows(values_only=True)
+    columns = list(next(rows))
+    # Text that pd.read_excel reads as missing, e.g. "n/a", is also made None so both give the same data
+    rows = (tuple(None if isinstance(value, str) and value in NA_VALUES else value for value in row)
+            for row in rows)
+    return columns, [row for row in rows if any(value is not None for value in row)]
+
+
+def iter_record_batches(sheet_names=SHEETS, package="tutor.data", batch_size=500):
+    """
+    Read the sheets and yield their rows in batches, in the order of sheet_names.
+
+    Uses the Arrow files if they exist and are newer than the Excel file. Otherwise, the workbook is opened once and
+    each sheet is parsed when its batches are next to be yielded.
+
+    Parameters:
+        sheet_names: list of the sheets to read
+        package: str  Name of the data package, e.g. tutor.data or student.data
+        batch_size: int  Maximum number of rows in each batch
+
+    Yields:
+        (sheet_name, batch): tuple of the sheet name and a DataFrame of up to batch_size rows
+    """
+    excel_path = resources.files(package).joinpath("paralympics.xlsx")
+    excel_mtime = excel_path.stat().st_mtime
+    arrow_sheets = [sheet_name for sheet_name in sheet_names
+                    if feather is not None and arrow_path(sheet_name, package).is_file()
+                    and arrow_path(sheet_name, package).stat().st_mtime >= excel_mtime]
+    excel_sheets = [sheet_name for sheet_name in sheet_names if sheet_name not in arrow_sheets]
+
+    workbook = openpyxl.load_workbook(str(excel_path), read_only=True, data_only=True) if excel_sheets else None
+    try:
+        for sheet_name in sheet_names:
+            if sheet_name in excel_sheets:
+                columns, rows = parse_sheet(workbook, sheet_name)
+                # Columns of numbers with empty cells are object columns of numbers and None, make them float. The types
+                # are inferred from all the rows of the sheet so that every batch has the same types.
+                df = pd.DataFrame.from_records(rows, columns=columns).infer_objects()
+                del rows
+                for start in range(0, len(df), batch_size):
+                    yield sheet_name, df.iloc[start:start + batch_size]
+            else:
+                # Memory-mapped, so each slice only reads its own rows
+                df = feather.read_feather(str(arrow_path(sheet_name, package)), memory_map=True)
+                for start in range(0, len(df), batch_size):
+                    yield sheet_name, df.iloc[start:start + batch_size]
+    finally:
+        if workbook is not None:
+            workbook.close()
+
+
+def read_sheets(sheet_names=SHEETS, package="tutor.data"):
+    """
+    Read several sheets of the paralympics data, parsing the Excel file only once.
+
+    Parameters:
+        sheet_names: list of the sheets to read
+        package: str  Name of the data package, e.g. tutor.data or student.data
+
+    Returns:
+        sheets: dict of {sheet name: DataFrame}
+    """
+    batches = {sheet_name: [] for sheet_name in sheet_names}
+    for sheet_name, batch in iter_record_batches(sheet_names, package, batch_size=100000):
+        batches[sheet_name].append(batch)
+    return {sheet_name: pd.concat(dfs, ignore_index=True) for sheet_name, dfs in batches.items()}
+
+
+if __name__ == "__main__":
+    for data_package in PACKAGES:
+        for arrow_file in convert_excel(data_package):
+            print(f"Written {arrow_file}")
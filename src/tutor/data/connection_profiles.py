@@ -0,0 +1,111 @@
+"""
+Named settings for opening SQLite connections, so every part of the code opens the databases in the same way.
+
+Each profile has the parameters added to the database's URI and the PRAGMAs run when a connection is opened:
+
+    immutable: for the paralympics.db that is shipped with the code and never changed while the apps run. The file is
+        opened read-only with immutable=1, so SQLite does not lock the file or check whether another process has
+        changed it, and is read through a large memory map and page cache.
+    read: for a database that the app reads while another process writes to it. Uses WAL mode, so reads do not wait
+        for writes, with the same memory map and cache, and the connection cannot make changes.
+    write: for the loaders, sync and the quiz routes. Uses WAL mode with synchronous=NORMAL, which is safe in WAL mode
+        and much quicker than FULL, and waits up to 5 seconds for a lock rather than failing.
+
+In a Flask app the profile is chosen with SQLITE_PROFILE in the config. Profiles can be changed or added with
+SQLITE_PROFILES, e.g. to use a smaller cache:
+    SQLITE_PROFILES = {"read": {"pragmas": {"cache_size": -8000}}}
+"""
+import copy
+import sqlite3
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+# 256 MB memory map and 64 MB page cache (a negative cache_size is in KB)
+MMAP_SIZE = 268435456
+CACHE_SIZE = -64000
+
+PROFILES = {
+    "immutable": {
+        "uri": {"mode": "ro", "immutable": "1"},
+        "pragmas": {
+            "mmap_size": MMAP_SIZE,
+            "cache_size": CACHE_SIZE,
+            "temp_store": "MEMORY",
+            "foreign_keys": "ON",
+        },
+    },
+    "read": {
+        "uri": {},
+        "pragmas": {
+            "journal_mode": "WAL",
+            "mmap_size": MMAP_SIZE,
+            "cache_size": CACHE_SIZE,
+            "temp_store": "MEMORY",
+            "foreign_keys": "ON",
+            "query_only": "ON",
+        },
+    },
+    "write": {
+        "uri": {},
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "cache_size": CACHE_SIZE,
+            "temp_store": "MEMORY",
+            "foreign_keys": "ON",
+        },
+    },
+}
+
+
+def get_profile(name, overrides=None):
+    """
+    Return the settings of a profile.
+
+    Parameters:
+        name: str  Name of the profile, e.g. read
+        overrides: dict of {profile name: {"uri": {...}, "pragmas": {...}}} that change or add to the profiles,
+        e.g. SQLITE_PROFILES from the Flask config
+
+    Returns:
+        profile: dict with the keys uri and pragmas
+    """
+    profile = copy.deepcopy(PROFILES.get(name, {"uri": {}, "pragmas": {}}))
+    override = (overrides or {}).get(name, {})
+    if name not in PROFILES and not override:
+        raise ValueError(f'Unknown SQLite connection profile "{name}". Must be one of {list(PROFILES)}')
+    profile["uri"].update(override.get("uri", {}))
+    profile["pragmas"].update(override.get("pragmas", {}))
+    return profile
+
+
+def connect(path, profile="write", overrides=None, **kwargs):
+    """
+    Open a connection to a SQLite database using a profile.
+
+    Parameters:
+        path: str or Path  Path of the database file, or :memory:
+        profile: str  Name of the profile
+        overrides: dict of changes to the profiles, see get_profile
+        kwargs: other arguments for sqlite3.connect, e.g. check_same_thread or factory
+
+    Returns:
+        conn: sqlite3.Connection
+    """
+    settings = get_profile(profile, overrides)
+    if str(path) == ":memory:":
+        conn = sqlite3.connect(":memory:", **kwargs)
+    else:
+        uri = f"file:{quote(Path(path).as_posix())}"
+        if settings["uri"]:
+            uri += f"?{urlencode(settings['uri'])}"
+        conn = sqlite3.connect(uri, uri=True, **kwargs)
+    for pragma, value in settings["pragmas"].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+def connect_from_config(path, config, **kwargs):
+    """Open a connection using the SQLITE_PROFILE and SQLITE_PROFILES settings of a Flask app's config."""
+    return connect(path, config.get("SQLITE_PROFILE", "write"), config.get("SQLITE_PROFILES"), **kwargs)
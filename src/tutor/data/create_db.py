@@ -4,6 +4,8 @@ Contains functions to create the paralympics database without data.
 """
 import sqlite3
 
+from tutor.data.indexes import INDEX_SCHEMA
+from tutor.data.event_summary import rebuild_event_summary
 from tutor.flask_para_t import add_data
 
 
@@ -127,6 +129,7 @@ def create_db(cursor, connection):
 
     try:
         # Drop each table if they already exist
+        cursor.execute('DROP TABLE IF EXISTS event_summary;')
         cursor.execute('DROP TABLE IF EXISTS host_event;')
         cursor.execute('DROP TABLE IF EXISTS disability_event;')
         cursor.execute('DROP TABLE IF EXISTS participants;')
@@ -156,12 +159,20 @@ def create_db(cursor, connection):
         cursor.execute(student_response_sql)
         cursor.execute(medal_result_sql)
 
+        # Create the indexes, see tutor.data.indexes
+        for sql in INDEX_SCHEMA:
+            cursor.execute(sql)
+
         # Commit the changes
         connection.commit()
 
         # Call the function to add the data
         add_data.add_all_data(cursor, connection)
 
+        # Create the event_summary table read by the figures from the data that was added
+        rebuild_event_summary(cursor)
+        connection.commit()
+
     except sqlite3.Error as e:
         print(f'An error occurred creating the database. Error: {e}')
         if connection:
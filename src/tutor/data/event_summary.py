@@ -0,0 +1,130 @@
+"""
+Creates and rebuilds the event_summary table, a copy of the event data already joined to the hosts and participants.
+
+The charts, map and event cards all need the event, participants, host_event and host tables joined together. Rather
+than join them on every request, the loaders rebuild event_summary after they add or change the data, and the figures
+read this one table.
+
+There is a row for each host of each event, as the map has a marker and the cards have a "Host Year" label for each
+host city, e.g. the 1984 Summer paralympics was held in Stoke Mandeville and New York. host_number is 1 for the first
+host of each event, so charts with one point per event select the rows WHERE host_number = 1.
+
+The latitude and longitude are stored as REAL. They are NULL if the host table has no coordinates, as in the database
+created by student.placeholder.create_db. The participant counts are taken from the participants table if there is one,
+otherwise from the event table, as in tutor/data/paralympics.db.
+
+To rebuild the table in an existing database, e.g. after changing tutor/data/paralympics.db, run:
+python -m tutor.data.event_summary path/to/paralympics.db
+"""
+import sqlite3
+import sys
+
+from tutor.data import connection_profiles
+
+EVENT_SUMMARY_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS event_summary (
+        event_id INTEGER NOT NULL,
+        host_id INTEGER NOT NULL,
+        host_number INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        host TEXT NOT NULL,
+        country_code TEXT,
+        latitude REAL,
+        longitude REAL,
+        host_year TEXT NOT NULL,
+        countries INTEGER,
+        events INTEGER,
+        sports INTEGER,
+        participants_m INTEGER,
+        participants_f INTEGER,
+        participants INTEGER,
+        PRIMARY KEY (event_id, host_id))''',
+    # Used to find the card for a "Host Year" label
+    'CREATE UNIQUE INDEX IF NOT EXISTS ux_event_summary_host_year ON event_summary (host_year)',
+    # Used by the line charts to read one row per event, already in order of type and year
+    'CREATE INDEX IF NOT EXISTS idx_event_summary_host_number ON event_summary (host_number, type, year)',
+]
+
+# The columns of event_summary in the order they are selected by summary_select
+SUMMARY_COLUMNS = ['event_id', 'host_id', 'host_number', 'type', 'year', 'host', 'country_code', 'latitude',
+                   'longitude', 'host_year', 'countries', 'events', 'sports', 'participants_m', 'participants_f',
+                   'participants']
+
+
+def table_columns(cursor, table):
+    """Return the names of the columns of a table, or an empty list if the table does not exist."""
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+
+
+def summary_select(cursor):
+    """
+    Return the query that joins the tables to give the rows of event_summary.
+
+    Parameters:
+        cursor: sqlite cursor object for the database, used to check which columns the tables have
+
+    Returns:
+        sql: str
+    """
+    if 'latitude' in table_columns(cursor, 'host'):
+        coordinates = 'CAST(host.latitude AS REAL), CAST(host.longitude AS REAL)'
+    else:
+        coordinates = 'NULL, NULL'
+    if table_columns(cursor, 'participants'):
+        participants = 'participants'
+        participants_join = 'LEFT JOIN participants ON participants.event_id = event.event_id'
+    else:
+        participants = 'event'
+        participants_join = ''
+
+    # host_event rows are added in the order the hosts are listed for the event, so the rowid gives the first host
+    return f'''
+        SELECT event.event_id, host.host_id,
+            ROW_NUMBER() OVER (PARTITION BY event.event_id ORDER BY host_event.rowid),
+            event.type, event.year, host.host, host.country_code, {coordinates},
+            host.host || ' ' || event.year,
+            event.countries, event.events, event.sports,
+            {participants}.participants_m, {participants}.participants_f, {participants}.participants
+        FROM event
+        JOIN host_event ON host_event.event_id = event.event_id
+        JOIN host ON host.host_id = host_event.host_id
+        {participants_join}
+        '''
+
+
+def rebuild_event_summary(cursor):
+    """
+    Create the event_summary table if needed and replace its rows with the current data.
+
+    The changes are not committed, so the rebuild is part of the loader's transaction.
+
+    Parameters:
+        cursor: sqlite cursor object
+
+    Returns:
+        rows: int  Number of rows in event_summary
+    """
+    for sql in EVENT_SUMMARY_SCHEMA:
+        cursor.execute(sql)
+    cursor.execute('DELETE FROM event_summary')
+    cursor.execute(f'INSERT INTO event_summary ({", ".join(SUMMARY_COLUMNS)}) {summary_select(cursor)}')
+    return cursor.execute('SELECT COUNT(*) FROM event_summary').fetchone()[0]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python -m tutor.data.event_summary path/to/paralympics.db')
+        sys.exit(1)
+    # The shipped paralympics.db is opened with the immutable profile, which cannot read a database in WAL mode that
+    # has a -wal file, so the write profile's journal_mode is not used here
+    db_connection = connection_profiles.connect(sys.argv[1], 'write',
+                                                {'write': {'pragmas': {'journal_mode': 'DELETE'}}})
+    try:
+        summary_rows = rebuild_event_summary(db_connection.cursor())
+        db_connection.commit()
+        print(f'Rebuilt event_summary with {summary_rows} rows')
+    except sqlite3.Error as e:
+        print(f'An error occurred rebuilding event_summary. Error: {e}')
+        db_connection.rollback()
+    db_connection.close()
@@ -0,0 +1,25 @@
+"""
+The indexes of the paralympics database, created by both create_db.py files and by student.placeholder.sync_data.
+
+The unique indexes are on the natural key of each table, e.g. the year and type of an event. They stop the loaders
+adding the same row twice, and sync_data needs them for INSERT ... ON CONFLICT. host is unique, so each host has one
+host_id even if it is listed with more than one country, see student.placeholder.add_data_sql3.host_country_codes.
+
+The other indexes are on the foreign key columns that the joins and the event_summary rebuild look up rows by.
+medal_result(event_id) lookups use ux_medal_result_event_country as event_id is its first column. The query plans that
+use them can be checked with python -m student.placeholder.query_audit
+
+IF NOT EXISTS is used so that the indexes can be added to a database that was created before they were.
+"""
+
+INDEX_SCHEMA = [
+    'CREATE UNIQUE INDEX IF NOT EXISTS ux_event_year_type ON event (year, type)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ux_host_host ON host (host)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ux_participants_event ON participants (event_id)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ux_disability_category ON disability (category)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ux_medal_result_event_country ON medal_result (event_id, country_code)',
+    'CREATE INDEX IF NOT EXISTS idx_host_country ON host (country_code)',
+    'CREATE INDEX IF NOT EXISTS idx_host_event_event ON host_event (event_id)',
+    'CREATE INDEX IF NOT EXISTS idx_disability_event_event ON disability_event (event_id)',
+    'CREATE INDEX IF NOT EXISTS idx_medal_result_country ON medal_result (country_code)',
+]
@@ -0,0 +1,90 @@
+"""
+Keeps a value loaded from a file, e.g. a DataFrame or a model, and loads it again only when the file's contents change.
+
+Before each use the file's modified time and size are checked, which is cheap. Only if those change is the file hashed,
+and only if the hash changes is the value loaded again. A file that is touched or copied with the same contents is not
+loaded again. The hash is used as the version of the value, so results calculated from it can be kept until it changes.
+
+Used by tutor.dash_single_t.data_store for the events data and student.flask_paralympics.model_registry for the model.
+
+database_version is the cheaper check for values calculated from an SQLite database, e.g. the line charts in
+student.placeholder.figures_sqlite3, which are cached until the database file is written to.
+"""
+import hashlib
+import os
+import threading
+
+
+def file_stat(path):
+    """Return the modified time and size of the file, which change when it is written to."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def database_version(path):
+    """
+    Return a value that changes when an SQLite database file is written to, or None for an in-memory database.
+
+    In WAL mode the changes are written to the -wal file and only copied to the database file later, so the modified
+    time and size of both files are used.
+
+    Parameters:
+        path: str  Path of the database file, '' or ':memory:' for an in-memory database
+
+    Returns:
+        version: tuple of the file_stat of the database file and of its -wal file (None if there is no -wal file)
+    """
+    if not path or path == ":memory:" or not os.path.isfile(path):
+        return None
+    wal_path = f"{path}-wal"
+    return file_stat(path), file_stat(wal_path) if os.path.isfile(wal_path) else None
+
+
+def file_hash(path):
+    """Return the first 16 characters of the sha256 hash of the file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+class VersionedFile:
+    """
+    Thread-safe holder of the value loaded from a file.
+
+    Attributes:
+        path (str): Path of the file
+        load (function): Takes the path and returns the value
+        version (str): Short hash of the file contents the value was loaded from, None until it is loaded
+    """
+
+    def __init__(self, path, load):
+        self.path = str(path)
+        self.load = load
+        # (file (mtime, size), hash, value), replaced as a whole so readers never see a partly updated one
+        self._entry = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        entry = self._entry
+        return entry[1] if entry is not None else None
+
+    def get(self):
+        """Return the value, loading it if it has not been loaded yet or the file has changed since it was loaded."""
+        stat = file_stat(self.path)
+        entry = self._entry
+        if entry is not None and entry[0] == stat:
+            return entry[2]
+
+        with self._lock:
+            # Another thread may have loaded the value while this one was waiting for the lock
+            entry = self._entry
+            if entry is not None and entry[0] == stat:
+                return entry[2]
+            digest = file_hash(self.path)
+            if entry is not None and entry[1] == digest:
+                # The file was touched or copied but has the same contents
+                entry = (stat, digest, entry[2])
+            else:
+                entry = (stat, digest, self.load(self.path))
+            self._entry = entry
+            return entry[2]
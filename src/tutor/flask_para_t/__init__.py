@@ -0,0 +1,17 @@
+"""
+The tutor's Flask-SQLAlchemy database object for the paralympics app, as created in activity 7.2.
+
+The models are in models.py. student.placeholder.add_data uses both to add the data with the ORM, in an app that has
+called db.init_app(app).
+"""
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import DeclarativeBase
+
+
+# Create a SQLAlchemy declarative base object called Base to be used in the models (Python classes)
+class Base(DeclarativeBase):
+    pass
+
+
+# Create a SQLAlchemy object called db, the Base object is passed to the SQLAlchemy object
+db = SQLAlchemy(model_class=Base)
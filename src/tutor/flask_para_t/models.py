@@ -0,0 +1,230 @@
+"""
+The tutor's models of the paralympics database tables, the completed version of student/placeholder/models.py.
+
+The tables match those created with sqlite3 by student.placeholder.create_db, and db.create_all() adds the same
+indexes, see tutor.data.indexes.
+"""
+from typing import List, Optional
+
+from sqlalchemy import Float, ForeignKey, Integer, Text, event
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from tutor.data.indexes import INDEX_SCHEMA
+from tutor.flask_para_t import db
+
+
+# Note: db.Model is the declarative base class for SQLAlchemy that was defined in the __init__.py file
+class Event(db.Model):
+    __tablename__ = 'event'
+    event_id = mapped_column(Integer, primary_key=True)
+    type = mapped_column(Text, nullable=False)
+    year = mapped_column(Integer, nullable=False)
+    start: Mapped[Optional[str]] = mapped_column(Text)  # Different syntax to show the difference
+    end = mapped_column(Text)
+    duration = mapped_column(Integer)
+    countries = mapped_column(Integer)
+    events = mapped_column(Integer)
+    sports = mapped_column(Integer)
+    highlights = mapped_column(Text)
+    url = mapped_column(Text)
+
+    # Relationships - one-to-many:
+    host_events: Mapped[List["HostEvent"]] = relationship(back_populates="event")
+    disability_events: Mapped[List["DisabilityEvent"]] = relationship(back_populates="event")
+    medal_results: Mapped[List["MedalResult"]] = relationship(back_populates="event")
+    questions: Mapped[List["Question"]] = relationship(back_populates="event")
+    # one-to-one relationship:
+    participants: Mapped["Participants"] = relationship(back_populates="event")
+
+
+class Country(db.Model):
+    """
+    Represents a country in the database.
+
+    Attributes:
+        code (str): Primary key for the country.
+        name (str): Name of the country.
+        region (str): Region of the country.
+        sub_region (str): Sub-region of the country.
+        member_type (str): Type of team.
+        notes (str): Additional notes about the country.
+    """
+    __tablename__ = 'country'
+
+    code = mapped_column(Text, primary_key=True)
+    name = mapped_column(Text, nullable=False)
+    region = mapped_column(Text)
+    sub_region = mapped_column(Text)
+    member_type = mapped_column(Text)
+    notes = mapped_column(Text)
+    # Relationships
+    medal_results: Mapped[List["MedalResult"]] = relationship(back_populates="country")
+    hosts: Mapped[List["Host"]] = relationship(back_populates="country")
+
+
+class Disability(db.Model):
+    __tablename__ = 'disability'
+
+    disability_id = mapped_column(Integer, primary_key=True)
+    category = mapped_column(Text, nullable=False)
+    # Relationship to the DisabilityEvent table. back_populates takes the name of the relationship that is defined in the DisabilityClass
+    disability_events: Mapped[List["DisabilityEvent"]] = relationship(back_populates="disability")
+
+
+class DisabilityEvent(db.Model):
+    __tablename__ = 'disability_event'
+
+    # The primary key is (disability_id, event_id) as in create_db, rows are found by event_id with an index
+    disability_id: Mapped[int] = mapped_column(ForeignKey('disability.disability_id'), primary_key=True)
+    event_id: Mapped[int] = mapped_column(ForeignKey('event.event_id'), primary_key=True)
+
+    # Relationships to the parent classes: Event and Disability
+    # back_populates takes the name of the relationships that is defined in the parent classes (same name was used in both)
+    event: Mapped["Event"] = relationship("Event", back_populates="disability_events")
+    disability: Mapped["Disability"] = relationship("Disability", back_populates="disability_events")
+
+
+class Host(db.Model):
+    __tablename__ = 'host'
+
+    host_id = mapped_column(Integer, primary_key=True)
+    country_code = mapped_column(ForeignKey('country.code'))
+    host = mapped_column(Text, nullable=False)
+
+    # Relationships
+    host_events: Mapped[List["HostEvent"]] = relationship(back_populates="host")
+    country: Mapped["Country"] = relationship(back_populates="hosts")
+
+
+class HostEvent(db.Model):
+    __tablename__ = 'host_event'
+
+    host_id = mapped_column(Integer,
+                            ForeignKey('host.host_id', onupdate="CASCADE", ondelete="NO ACTION"),
+                            primary_key=True
+                            )
+    event_id = mapped_column(Integer,
+                             ForeignKey('event.event_id', onupdate="CASCADE", ondelete="NO ACTION"),
+                             primary_key=True
+                             )
+    # Relationships
+    event: Mapped["Event"] = relationship("Event", back_populates="host_events")
+    host: Mapped["Host"] = relationship("Host", back_populates="host_events")
+
+
+class Participants(db.Model):
+    __tablename__ = 'participants'
+
+    participant_id = mapped_column(Integer, primary_key=True)
+    event_id = mapped_column(Integer, ForeignKey('event.event_id'))
+    participants_m = mapped_column(Integer)
+    participants_f = mapped_column(Integer)
+    participants = mapped_column(Integer)
+
+    # THis is a one-to-one relationship:
+    event: Mapped["Event"] = relationship(back_populates="participants")
+
+
+class MedalResult(db.Model):
+    __tablename__ = 'medal_result'
+
+    result_id = mapped_column(Integer, primary_key=True)
+    event_id = mapped_column(Integer, ForeignKey('event.event_id'))
+    country_code = mapped_column(Text, ForeignKey('country.code'))
+    rank = mapped_column(Integer)
+    gold = mapped_column(Integer)
+    silver = mapped_column(Integer)
+    bronze = mapped_column(Integer)
+    total = mapped_column(Integer)
+    # Relationships
+    event: Mapped["Event"] = relationship(back_populates="medal_results")
+    country: Mapped["Country"] = relationship(back_populates="medal_results")
+
+
+class EventSummary(db.Model):
+    """
+    One row for each host of each event, with the event, host and participants data already joined.
+
+    Read by the charts so that they query a single table. The rows are replaced by the add_data functions after the
+    data is added, see tutor.data.event_summary, so it should not be changed directly.
+    """
+    __tablename__ = 'event_summary'
+
+    event_id = mapped_column(Integer, primary_key=True)
+    host_id = mapped_column(Integer, primary_key=True)
+    host_number = mapped_column(Integer, nullable=False)
+    type = mapped_column(Text, nullable=False)
+    year = mapped_column(Integer, nullable=False)
+    host = mapped_column(Text, nullable=False)
+    country_code = mapped_column(Text)
+    latitude = mapped_column(Float)
+    longitude = mapped_column(Float)
+    host_year = mapped_column(Text, nullable=False)
+    countries = mapped_column(Integer)
+    events = mapped_column(Integer)
+    sports = mapped_column(Integer)
+    participants_m = mapped_column(Integer)
+    participants_f = mapped_column(Integer)
+    participants = mapped_column(Integer)
+
+
+class Question(db.Model):
+    __tablename__ = 'question'
+
+    question_id = mapped_column(Integer, primary_key=True)
+    question = mapped_column(Text, nullable=False)
+    event_id = mapped_column(Integer, ForeignKey('event.event_id', onupdate="CASCADE", ondelete="CASCADE"))
+    # Relationships
+    event: Mapped["Event"] = relationship(back_populates="questions")
+    answer_choices: Mapped[List["AnswerChoice"]] = relationship(back_populates="question")
+
+
+class Quiz(db.Model):
+    __tablename__ = 'quiz'
+
+    quiz_id = mapped_column(Integer, primary_key=True)
+    quiz_name = mapped_column(Text, nullable=False)
+    close_date = mapped_column(Text)
+    # Relationships
+    responses: Mapped[List["StudentResponse"]] = relationship(back_populates="quiz")
+
+
+class AnswerChoice(db.Model):
+    __tablename__ = 'answer_choice'
+
+    ac_id = mapped_column(Integer, primary_key=True)
+    question_id = mapped_column(Integer, ForeignKey('question.question_id', onupdate="CASCADE", ondelete="CASCADE"),
+                                nullable=False)
+    choice_text = mapped_column(Text, nullable=False)
+    choice_value = mapped_column(Integer)
+    is_correct = mapped_column(Integer)
+    # Relationships
+    question: Mapped["Question"] = relationship(back_populates="answer_choices")
+
+
+class QuizQuestion(db.Model):
+    __tablename__ = 'quiz_question'
+
+    question_id = mapped_column(Integer, ForeignKey('question.question_id', onupdate="CASCADE", ondelete="CASCADE"),
+                                primary_key=True)
+    quiz_id = mapped_column(Integer, ForeignKey('quiz.quiz_id', onupdate="CASCADE", ondelete="CASCADE"),
+                            primary_key=True)
+
+
+class StudentResponse(db.Model):
+    __tablename__ = 'student_response'
+
+    response_id = mapped_column(Integer, primary_key=True)
+    student_email = mapped_column(Text, nullable=False)
+    score = mapped_column(Integer, nullable=False)
+    quiz_id = mapped_column(Integer, ForeignKey('quiz.quiz_id', onupdate="CASCADE", ondelete="CASCADE"),
+                            nullable=False)
+    # Relationships
+    quiz: Mapped["Quiz"] = relationship(back_populates="responses")
+
+
+@event.listens_for(db.metadata, "after_create")
+def create_indexes(target, connection, **kw):
+    """Add the indexes of the paralympics database after db.create_all() has created the tables."""
+    for sql in INDEX_SCHEMA:
+        connection.exec_driver_sql(sql)
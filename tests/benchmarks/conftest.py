@@ -0,0 +1,137 @@
+"""
+Fixtures for the benchmarks.
+
+Each benchmark is run several times and the percentiles of the times are compared with the baseline in baselines.json.
+A benchmark fails if its median time is more than the threshold above the baseline median (see --benchmark-threshold).
+
+The benchmarks are skipped unless --benchmark is given, as the baselines are times measured on one computer:
+python -m pytest tests/benchmarks --benchmark
+
+To save new baselines, e.g. after an optimisation or on a different computer, run:
+python -m pytest tests/benchmarks --benchmark-save
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+BASELINES_PATH = Path(__file__).parent.joinpath("baselines.json")
+
+# Timings below a millisecond vary a lot between runs, so a benchmark is allowed to be this much slower whatever the
+# threshold
+MIN_SLACK_MS = 0.5
+
+# Results of the benchmarks run in this session, used for the report and to save new baselines
+results = {}
+
+
+def percentile(sorted_values, pct):
+    """Return the value at the percentile (0 to 100) of a sorted list, using the nearest rank."""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_benchmark(func, rounds, warmup, setup):
+    """
+    Time func and count its memory allocations.
+
+    Parameters:
+        func: function with no arguments to benchmark
+        rounds: int  Number of timed runs
+        warmup: int  Number of runs before timing, e.g. so that lazy imports and caches are loaded
+        setup: function with no arguments run before each run, not timed, or None
+
+    Returns:
+        result: dict of the time percentiles in milliseconds, the peak memory in KB and the retained memory blocks
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    times = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+
+    # Memory is measured in a separate run as tracing allocations slows the code down.
+    # retained_blocks is the number of memory blocks still allocated after the run, e.g. objects added to a cache.
+    if setup:
+        setup()
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    blocks = sys.getallocatedblocks() - blocks_before
+
+    return {
+        "rounds": rounds,
+        "p50_ms": round(percentile(times, 50), 3),
+        "p90_ms": round(percentile(times, 90), 3),
+        "p99_ms": round(percentile(times, 99), 3),
+        "max_ms": round(times[-1], 3),
+        "peak_kb": round(peak / 1024, 1),
+        "retained_blocks": blocks,
+    }
+
+
+@pytest.fixture(scope="session")
+def baselines():
+    """The baseline results saved in baselines.json"""
+    if BASELINES_PATH.exists():
+        return json.loads(BASELINES_PATH.read_text())
+    return {}
+
+
+@pytest.fixture
+def benchmark(request, baselines):
+    """
+    Fixture that returns a function to run a benchmark and check it against the baseline.
+
+    Usage: benchmark("name", func, rounds=20, warmup=1, setup=None)
+    """
+    threshold = request.config.getoption("--benchmark-threshold")
+    save = request.config.getoption("--benchmark-save")
+
+    def _benchmark(name, func, rounds=20, warmup=1, setup=None):
+        result = run_benchmark(func, rounds, warmup, setup)
+        results[name] = result
+        baseline = baselines.get(name)
+        if baseline and not save:
+            limit = max(baseline["p50_ms"] * (1 + threshold), baseline["p50_ms"] + MIN_SLACK_MS)
+            assert result["p50_ms"] <= limit, (
+                f"{name} median {result['p50_ms']}ms is slower than the baseline {baseline['p50_ms']}ms "
+                f"by more than {threshold:.0%}"
+            )
+        return result
+
+    return _benchmark
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """Print a table of the benchmark results, and save them as the baselines if --benchmark-save was given."""
+    if not results:
+        return
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        f"{'name':<40} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'peak KB':>10} {'blocks':>10}")
+    for name, r in sorted(results.items()):
+        terminalreporter.write_line(
+            f"{name:<40} {r['p50_ms']:>10} {r['p90_ms']:>10} {r['p99_ms']:>10} {r['peak_kb']:>10} "
+            f"{r['retained_blocks']:>10}")
+    if config.getoption("--benchmark-save"):
+        saved = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+        saved.update(results)
+        BASELINES_PATH.write_text(json.dumps(dict(sorted(saved.items())), indent=2) + "\n")
+        terminalreporter.write_line(f"Baselines saved to {BASELINES_PATH}")
@@ -0,0 +1,164 @@
+"""
+Benchmarks for the Dash figure functions, the Dash callbacks and the functions that load the data into the database.
+
+The results are compared with tests/benchmarks/baselines.json, see conftest.py in this directory.
+"""
+import sqlite3
+
+import pytest
+
+from tutor.dash_single_t.figure_cache import figure_cache
+
+
+@pytest.fixture(scope="module")
+def dash_app():
+    """The week 3 Dash app. Importing it creates the Dash app, which create_card needs for dash.get_asset_url."""
+    from tutor.dash_single_t import paralympics_dash_3
+    return paralympics_dash_3
+
+
+@pytest.mark.parametrize("feature", ["events", "sports", "countries", "participants"])
+def test_create_line_chart(benchmark, feature):
+    from tutor.dash_single_t.figures import create_line_chart
+    benchmark(f"create_line_chart[{feature}]", lambda: create_line_chart(feature))
+
+
+@pytest.mark.parametrize("event_type", ["summer", "winter"])
+def test_create_bar_chart(benchmark, event_type):
+    from tutor.dash_single_t.figures import create_bar_chart
+    benchmark(f"create_bar_chart[{event_type}]", lambda: create_bar_chart(event_type))
+
+
+def test_create_scatter_geo(benchmark):
+    from tutor.dash_single_t.figures import create_scatter_geo
+    benchmark("create_scatter_geo", create_scatter_geo)
+
+
+def test_create_card(benchmark, dash_app):
+    from tutor.dash_single_t.figures import create_card
+    benchmark("create_card", lambda: create_card("Sydney 2000"), rounds=200)
+
+
+def test_callback_update_line_chart(benchmark, dash_app):
+    benchmark("callback update_line_chart", lambda: dash_app.update_line_chart("sports"), rounds=200)
+
+
+def test_callback_update_bar_chart(benchmark, dash_app):
+    benchmark("callback update_bar_chart", lambda: dash_app.update_bar_chart(["summer", "winter"]), rounds=200)
+
+
+def test_callback_display_card(benchmark, dash_app):
+    hover_data = {"points": [{"hovertext": "Sydney 2000"}]}
+    benchmark("callback display_card", lambda: dash_app.display_card(hover_data), rounds=200)
+
+
+def test_callback_update_line_chart_uncached(benchmark, dash_app):
+    # Clear the figure cache before each run to time the callback when the figure is not in the cache
+    benchmark("callback update_line_chart uncached", lambda: dash_app.update_line_chart("sports"),
+              setup=figure_cache.clear)
+
+
+@pytest.mark.parametrize("bulk", [False, True], ids=["rows", "bulk"])
+def test_add_data_sql3(benchmark, bulk):
+    from student.placeholder.create_db import create_db
+
+    def load():
+        # create_db creates the tables and then calls add_data_sql3.add_all_data or add_all_data_bulk
+        connection = sqlite3.connect(":memory:")
+        create_db(connection.cursor(), connection, bulk=bulk)
+        connection.close()
+
+    name = "add_data_sql3.add_all_data_bulk" if bulk else "add_data_sql3.add_all_data"
+    benchmark(name, load, rounds=5)
+
+
+@pytest.mark.parametrize("bulk", [False, True], ids=["rows", "bulk"])
+def test_add_data_sqlalchemy(benchmark, bulk):
+    add_data = pytest.importorskip("student.placeholder.add_data", reason="needs Flask-SQLAlchemy",
+                                   exc_type=ImportError)
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    add_data.db.init_app(app)
+
+    def reset():
+        add_data.db.drop_all()
+        add_data.db.create_all()
+
+    with app.app_context():
+        if bulk:
+            benchmark("add_data.add_all_data_bulk", add_data.add_all_data_bulk, rounds=5, setup=reset)
+        else:
+            benchmark("add_data.add_all_data", add_data.add_all_data, rounds=5, setup=reset)
+
+
+def concat_host_countries(df_events):
+    """The host and country extraction that add_host_data used before host_country_codes, kept for comparison."""
+    import pandas as pd
+
+    host_country_df = pd.DataFrame(columns=["host", "country"])
+    for index, row in df_events.iterrows():
+        hosts = row["host"].split(",")
+        countries = row["country"].split(",")
+        for host, country in zip(hosts, countries):
+            new_row = pd.DataFrame({"host": [host.strip()], "country": [country.strip()]})
+            host_country_df = pd.concat([host_country_df, new_row], ignore_index=True)
+    return host_country_df.drop_duplicates(subset=["host", "country"])
+
+
+@pytest.mark.parametrize("scale", [1, 100, 1000])
+@pytest.mark.parametrize("method", ["concat", "explode"])
+def test_host_extraction(benchmark, request, method, scale):
+    import pandas as pd
+
+    from student.placeholder.add_data_sql3 import host_country_codes
+    from tutor.data.columnar import read_sheet
+
+    if method == "concat" and scale == 1000 and not request.config.getoption("--benchmark-slow"):
+        pytest.skip("takes about 30 seconds, run with --benchmark-slow")
+    # The events repeated scale times, so there are scale times as many host and country pairs to extract
+    events = pd.concat([read_sheet("events")] * scale, ignore_index=True)
+    npc = read_sheet("npc_codes")
+    if method == "concat":
+        func = lambda: concat_host_countries(events)
+    else:
+        func = lambda: host_country_codes(events, npc)
+    rounds = 1 if method == "concat" and scale >= 100 else 5
+    benchmark(f"host_extraction[{method}-{scale}x]", func, rounds=rounds, warmup=0 if rounds == 1 else 1)
+
+
+def pool_parse_sheet(excel_path, sheet_name):
+    """Open the workbook and parse one sheet, as each worker process did in the process pool version of read_sheets."""
+    import openpyxl
+
+    from tutor.data.columnar import parse_sheet
+
+    workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        return parse_sheet(workbook, sheet_name)
+    finally:
+        workbook.close()
+
+
+def pool_read_sheets(sheet_names):
+    """The sheets parsed at the same time in a new process pool, as read_sheets used to, kept for comparison."""
+    from concurrent.futures import ProcessPoolExecutor
+    from importlib import resources
+
+    excel_path = str(resources.files("tutor.data").joinpath("paralympics.xlsx"))
+    with ProcessPoolExecutor(max_workers=len(sheet_names)) as pool:
+        return dict(zip(sheet_names, pool.map(pool_parse_sheet, [excel_path] * len(sheet_names), sheet_names)))
+
+
+@pytest.mark.parametrize("method", ["in-process", "process-pool"])
+def test_read_sheets_excel(benchmark, monkeypatch, method):
+    from tutor.data import columnar
+
+    # Parse the Excel file even if the Arrow files have been created
+    monkeypatch.setattr(columnar, "feather", None)
+    if method == "in-process":
+        func = lambda: columnar.read_sheets(columnar.SHEETS)
+    else:
+        func = lambda: pool_read_sheets(columnar.SHEETS)
+    benchmark(f"read_sheets_excel[{method}]", func, rounds=10)
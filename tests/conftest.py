@@ -1 +1,27 @@
-# Placeholder
\ No newline at end of file
+# Placeholder
+import pytest
+
+
+# Options for the benchmarks in tests/benchmarks. These have to be in this conftest.py as pytest only reads
+# command line options from the conftest.py in the tests directory.
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", default=False,
+                     help="Run the benchmarks in tests/benchmarks, which are skipped by default as their times depend "
+                          "on the computer")
+    parser.addoption("--benchmark-threshold", type=float, default=1.0,
+                     help="Fail a benchmark if its median time is more than this fraction above the baseline, "
+                          "e.g. 0.5 allows it to be 50%% slower. Default 1.0 (twice as slow).")
+    parser.addoption("--benchmark-save", action="store_true", default=False,
+                     help="Save the benchmark results as the new baselines in tests/benchmarks/baselines.json")
+    parser.addoption("--benchmark-slow", action="store_true", default=False,
+                     help="Also run the benchmarks that take more than a few seconds each")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the benchmarks unless --benchmark or --benchmark-save was given."""
+    if config.getoption("--benchmark") or config.getoption("--benchmark-save"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmarks" in item.path.parts:
+            item.add_marker(skip)
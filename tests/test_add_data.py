@@ -0,0 +1,50 @@
+"""
+Tests that the ORM loaders in student.placeholder.add_data add the same data one row at a time and in bulk.
+"""
+import pytest
+
+pytest.importorskip("flask_sqlalchemy")
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from student.placeholder import add_data  # noqa: E402
+
+# The query for the rows of each table. The disability ids depend on the order the categories are added in, so the
+# disability tables are compared on the category.
+TABLE_QUERIES = {
+    'country': 'SELECT * FROM country',
+    'event': 'SELECT * FROM event',
+    'participants': 'SELECT * FROM participants',
+    'host': 'SELECT * FROM host',
+    'host_event': 'SELECT * FROM host_event',
+    'disability': 'SELECT category FROM disability',
+    'disability_event': 'SELECT event_id, category FROM disability_event JOIN disability USING (disability_id)',
+    'medal_result': 'SELECT event_id, country_code, rank, gold, silver, bronze, total FROM medal_result',
+    'event_summary': 'SELECT * FROM event_summary',
+}
+
+
+def load_tables(add_all_data):
+    """Add the data to a new in-memory database with the function, and return {table: sorted rows}."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    add_data.db.init_app(app)
+    with app.app_context():
+        add_data.db.create_all()
+        add_all_data()
+        return {table: sorted(add_data.db.session.execute(text(sql)).all(), key=repr)
+                for table, sql in TABLE_QUERIES.items()}
+
+
+def test_bulk_matches_row_by_row():
+    """
+    GIVEN the paralympics data
+    WHEN it is added to one database by add_all_data and to another by add_all_data_bulk
+    THEN every table should have the same rows in both, and none should be empty
+    """
+    rows = load_tables(add_data.add_all_data)
+    bulk = load_tables(add_data.add_all_data_bulk)
+    for table in TABLE_QUERIES:
+        assert rows[table], table
+        assert bulk[table] == rows[table], table
@@ -0,0 +1,43 @@
+"""
+Tests of the sqlite3 loaders in student.placeholder.add_data_sql3.
+"""
+import sqlite3
+
+import pytest
+
+from student.placeholder import add_data_sql3
+from student.placeholder.create_db import create_db
+
+
+@pytest.fixture(scope="module")
+def sheets_with_unknown_host():
+    """The sheets of paralympics.xlsx with a host in a country that is not in the npc codes added to the first event."""
+    sheets = add_data_sql3.read_sheets(['events', 'medal_standings', 'npc_codes'])
+    events = sheets['events']
+    events.loc[0, 'host'] = events.loc[0, 'host'] + ', Atlantis'
+    events.loc[0, 'country'] = events.loc[0, 'country'] + ', Not a country'
+    return sheets
+
+
+def host_event_rows(sheets, bulk, monkeypatch):
+    """Create an in-memory database from the sheets and return its sorted (host, year, type) host_event rows."""
+    monkeypatch.setattr(add_data_sql3, 'read_sheets', lambda sheet_names: sheets)
+    connection = sqlite3.connect(':memory:')
+    create_db(connection.cursor(), connection, bulk=bulk)
+    rows = connection.execute('SELECT host, year, type FROM host_event JOIN host USING (host_id) '
+                              'JOIN event USING (event_id) ORDER BY host, year, type').fetchall()
+    connection.close()
+    return rows
+
+
+def test_host_in_unknown_country_skipped(sheets_with_unknown_host, monkeypatch):
+    """
+    GIVEN the paralympics data with a host in a country that is not in the npc codes
+    WHEN it is added one row at a time and in bulk
+    THEN both should add the host_event rows of the other hosts, and none for the unknown host
+    """
+    rows = host_event_rows(sheets_with_unknown_host, False, monkeypatch)
+    bulk = host_event_rows(sheets_with_unknown_host, True, monkeypatch)
+    assert rows
+    assert rows == bulk
+    assert 'Atlantis' not in {host for host, year, event_type in rows}
@@ -0,0 +1,114 @@
+"""
+Tests of the /predict/batch, /predict/forecast and /model-stats routes of student.flask_paralympics.
+
+The app is given a small .npz model, see compact_model.py, so the tests do not need scikit-learn or a trained model.
+"""
+import numpy as np
+import pytest
+
+from student.flask_paralympics import create_app
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    """A compact model that predicts 10 + (year - 2000) medals for China and 5 + (year - 2000) for Great Britain."""
+    path = tmp_path.joinpath("model.npz")
+    np.savez(path, intercept=-2000.0, year_coef=1.0, teams=np.array(["China", "Great Britain"]),
+             team_coefs=np.array([10.0, 5.0]))
+    return str(path)
+
+
+@pytest.fixture
+def client(model_file):
+    """A test client of the app using the compact model."""
+    app = create_app({"TESTING": True, "MODEL_PATH": model_file})
+    return app.test_client()
+
+
+def test_batch_prediction_years_and_teams(client):
+    """
+    GIVEN the app with a model
+    WHEN /predict/batch is posted years and teams, one of which the model does not know
+    THEN the response should have a prediction for every year and team, and None for the unknown team
+    """
+    response = client.post("/predict/batch", json={"years": [2024, 2028], "teams": ["China", "Atlantis"]})
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {"Year": 2024, "Team": "China", "Prediction": 34},
+        {"Year": 2024, "Team": "Atlantis", "Prediction": None},
+        {"Year": 2028, "Team": "China", "Prediction": 38},
+        {"Year": 2028, "Team": "Atlantis", "Prediction": None},
+    ]
+
+
+def test_batch_prediction_pairs_as_csv(client):
+    """
+    GIVEN the app with a model
+    WHEN /predict/batch?format=csv is posted pairs of year and team
+    THEN the response should be CSV with a header row and a row for each pair
+    """
+    response = client.post("/predict/batch?format=csv", json={"pairs": [[2024, "Great Britain"]]})
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.get_data(as_text=True).splitlines() == ["Year,Team,Prediction", "2024,Great Britain,29"]
+
+
+@pytest.mark.parametrize("body", [
+    "pairs",
+    [2028, "China"],
+    {},
+    {"years": 2028, "teams": ["China"]},
+    {"years": [2028], "teams": "China"},
+    {"pairs": [2028, "China"]},
+    {"pairs": [[2028]]},
+    {"pairs": [["not a year", "China"]]},
+])
+def test_batch_prediction_malformed_body(client, body):
+    """
+    GIVEN the app with a model
+    WHEN /predict/batch is posted a JSON body that is not in the form of "pairs", or "years" and "teams" lists
+    THEN the response should be a 400 with a JSON error
+    """
+    response = client.post("/predict/batch", json=body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_forecast_bad_format(client):
+    """
+    GIVEN the app with a model
+    WHEN /predict/forecast is asked for in a format other than json or csv
+    THEN the response should be a 400 with a JSON error
+    """
+    response = client.get("/predict/forecast?format=xml")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_forecast_and_model_stats(client):
+    """
+    GIVEN the app with a model
+    WHEN /predict/forecast and then /model-stats are requested
+    THEN the forecast should have a row for each known team for each upcoming games, and the stats should show the
+    model was loaded
+    """
+    forecast = client.get("/predict/forecast").get_json()
+    assert {row["Team"] for row in forecast} == {"China", "Great Britain"}
+    assert len(forecast) == 2 * len({row["Year"] for row in forecast})
+
+    stats = client.get("/model-stats").get_json()
+    assert stats["model.npz"]["loads"] >= 1
+
+
+def test_model_not_loaded(tmp_path):
+    """
+    GIVEN the app with a model file that does not exist
+    WHEN /predict/batch and /predict/forecast are requested
+    THEN the responses should be a 503 with a JSON error
+    """
+    app = create_app({"TESTING": True, "MODEL_PATH": str(tmp_path.joinpath("missing.npz"))})
+    client = app.test_client()
+    for response in (client.post("/predict/batch", json={"pairs": [[2028, "China"]]}),
+                     client.get("/predict/forecast")):
+        assert response.status_code == 503
+        assert "error" in response.get_json()
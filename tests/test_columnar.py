@@ -0,0 +1,55 @@
+"""
+Tests that the faster ways of reading paralympics.xlsx in tutor.data.columnar give the same data as pd.read_excel.
+"""
+from importlib import resources
+
+import pandas as pd
+import pytest
+
+from tutor.data import columnar
+
+
+@pytest.fixture(scope="module")
+def excel_sheets():
+    """The sheets of the tutor paralympics.xlsx read by pd.read_excel."""
+    excel_path = resources.files("tutor.data").joinpath("paralympics.xlsx")
+    return pd.read_excel(excel_path, sheet_name=columnar.SHEETS)
+
+
+def test_read_sheets_from_excel_matches_read_excel(excel_sheets, monkeypatch):
+    """
+    GIVEN the sheets of paralympics.xlsx
+    WHEN they are read by read_sheets without Arrow files, so the workbook is parsed with openpyxl
+    THEN each sheet should equal the DataFrame given by pd.read_excel, including the missing values e.g. "n/a"
+    """
+    monkeypatch.setattr(columnar, "feather", None)
+    sheets = columnar.read_sheets(columnar.SHEETS, "tutor.data")
+    for sheet_name in columnar.SHEETS:
+        pd.testing.assert_frame_equal(sheets[sheet_name], excel_sheets[sheet_name], obj=sheet_name)
+
+
+def test_read_sheets_from_arrow_matches_read_excel(excel_sheets, monkeypatch, tmp_path):
+    """
+    GIVEN the sheets of paralympics.xlsx converted to Arrow files
+    WHEN they are read by read_sheets
+    THEN each sheet should equal the DataFrame given by pd.read_excel
+    """
+    if columnar.feather is None:
+        pytest.skip("needs pyarrow")
+    monkeypatch.setattr(columnar, "arrow_path", lambda sheet_name, package: tmp_path.joinpath(f"{sheet_name}.arrow"))
+    columnar.convert_excel("tutor.data")
+    sheets = columnar.read_sheets(columnar.SHEETS, "tutor.data")
+    for sheet_name in columnar.SHEETS:
+        pd.testing.assert_frame_equal(sheets[sheet_name], excel_sheets[sheet_name], obj=sheet_name)
+
+
+def test_iter_record_batches_from_excel_same_dtypes(excel_sheets, monkeypatch):
+    """
+    GIVEN the sheets of paralympics.xlsx
+    WHEN they are read in small batches by iter_record_batches without Arrow files
+    THEN every batch of a sheet should have the same column types as the DataFrame given by pd.read_excel, even if
+    a column has no empty cells in some batches
+    """
+    monkeypatch.setattr(columnar, "feather", None)
+    for sheet_name, batch in columnar.iter_record_batches(columnar.SHEETS, "tutor.data", batch_size=10):
+        pd.testing.assert_series_equal(batch.dtypes, excel_sheets[sheet_name].dtypes, obj=sheet_name)
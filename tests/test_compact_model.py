@@ -0,0 +1,63 @@
+"""
+Tests that the NumPy-only model in student.flask_paralympics.compact_model predicts the same as the scikit-learn
+Pipeline it was exported from by student.placeholder.create_ml_model.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sklearn.linear_model import LinearRegression  # noqa: E402
+
+from student.flask_paralympics.compact_model import load_compact_model  # noqa: E402
+from student.placeholder import create_ml_model  # noqa: E402
+from tutor.data import columnar  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    """The Year, Team and Total of the medal standings in the bundled student paralympics.xlsx."""
+    # Parse the Excel file, so the test does not write Arrow files into the package
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(columnar, "feather", None)
+        return create_ml_model.load_training_data()
+
+
+@pytest.fixture(scope="module")
+def pipeline(training_data):
+    """The Pipeline fitted on the training data, as train_and_save_model fits the best candidate."""
+    X = training_data[["Year", "Team"]]
+    pipeline = create_ml_model.make_pipeline(LinearRegression(), sorted(X["Team"].unique()))
+    return pipeline.fit(X, training_data["Total"])
+
+
+@pytest.fixture(scope="module")
+def compact_model(pipeline, tmp_path_factory):
+    """The CompactModel loaded from the .npz file exported from the fitted pipeline."""
+    path = tmp_path_factory.mktemp("model").joinpath("model.npz")
+    create_ml_model.export_compact_model(pipeline, str(path))
+    return load_compact_model(str(path))
+
+
+def test_compact_model_predicts_as_pipeline(training_data, pipeline, compact_model):
+    """
+    GIVEN a Pipeline fitted on the medal standings and the CompactModel exported from it
+    WHEN both predict the total medals for every row of the training data
+    THEN the predictions should be the same
+    """
+    df = training_data[["Year", "Team"]]
+    assert np.allclose(pipeline.predict(df), compact_model.predict(df))
+
+
+def test_compact_model_unknown_team_raises_value_error(pipeline, compact_model):
+    """
+    GIVEN a Pipeline fitted on the medal standings and the CompactModel exported from it
+    WHEN both predict for a team that is not in the training data
+    THEN both should raise a ValueError
+    """
+    df = pd.DataFrame({"Year": [2028], "Team": ["Not a team"]})
+    with pytest.raises(ValueError):
+        pipeline.predict(df)
+    with pytest.raises(ValueError):
+        compact_model.predict(df)
@@ -0,0 +1,19 @@
+"""
+Tests of the events store in tutor.dash_single_t.data_store.
+"""
+from tutor.dash_single_t import data_store
+
+
+def test_events_store_reads_missing_participants(tmp_path):
+    """
+    GIVEN an events csv file with a missing participants value
+    WHEN it is read by an EventsStore
+    THEN it should be read with the missing value rather than raising an error
+    """
+    path = tmp_path.joinpath("events.csv")
+    path.write_text("type,year,country,host,countries,events,sports,participants_m,participants_f,participants\n"
+                    "summer,1960,Italy,Rome,23,57,8,,,209\n"
+                    "summer,1964,Japan,Tokyo,21,144,9,,,\n")
+    df = data_store.EventsStore(path).get()
+    assert df["participants"].tolist()[0] == 209
+    assert df["participants"].isna().tolist() == [False, True]
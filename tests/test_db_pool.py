@@ -0,0 +1,54 @@
+"""
+Tests for the pool of SQLite connections used by the Dash figures.
+"""
+import sqlite3
+
+from tutor.dash_single_t.db_pool import ConnectionPool
+
+
+def write_database(path, rows):
+    """Create a database at path with a table of the given number of rows."""
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE IF EXISTS item")
+    conn.execute("CREATE TABLE item (item_id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO item (name) VALUES (?)", [(f"item {i}",) for i in range(rows)])
+    conn.commit()
+    conn.close()
+
+
+def test_connection_released_after_file_changed_is_closed(tmp_path):
+    """
+    GIVEN a pool of immutable connections with one connection in use
+    WHEN the database file is replaced and the connection is then released
+    THEN the connection should be closed rather than returned to the pool
+    AND the next connection should read the new file
+    """
+    path = tmp_path.joinpath("test.db")
+    write_database(path, 1)
+    pool = ConnectionPool(path)
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM item").fetchone()[0] == 1
+    write_database(path, 500)
+    pool.release(conn)
+
+    assert pool.stats()["idle"] == 0
+    with pool.connection() as new_conn:
+        assert new_conn is not conn
+        assert new_conn.execute("SELECT COUNT(*) FROM item").fetchone()[0] == 500
+
+
+def test_connection_released_when_file_unchanged_is_reused(tmp_path):
+    """
+    GIVEN a pool of connections
+    WHEN a connection is released and the database file has not changed
+    THEN the same connection should be given out again
+    """
+    path = tmp_path.joinpath("test.db")
+    write_database(path, 1)
+    pool = ConnectionPool(path)
+
+    with pool.connection() as conn:
+        pass
+    with pool.connection() as second_conn:
+        assert second_conn is conn
@@ -0,0 +1,62 @@
+"""
+Tests that the line charts cached by student.placeholder.figures_sqlite3 are created again when the database changes.
+"""
+import sqlite3
+
+import pytest
+
+from student.placeholder import figures_sqlite3
+from student.placeholder.create_db import create_db
+
+
+def make_db(path):
+    """Create a paralympics database file with create_db and return a connection to it."""
+    connection = sqlite3.connect(path)
+    create_db(connection.cursor(), connection)
+    return connection
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A connection to a new paralympics database file, with an empty line chart cache."""
+    monkeypatch.setattr(figures_sqlite3, "line_chart_cache", {})
+    connection = make_db(str(tmp_path.joinpath("paralympics.db")))
+    yield connection
+    connection.close()
+
+
+def test_line_chart_cached_until_database_changes(db):
+    """
+    GIVEN a line chart created from a database
+    WHEN it is asked for again, then the database is changed by another connection and it is asked for again
+    THEN the cached chart should be returned the second time, and a new chart with the new data the third time
+    """
+    chart = figures_sqlite3.line_chart("sports", db)
+    assert figures_sqlite3.line_chart("sports", db) is chart
+
+    path = figures_sqlite3.database_path(db)
+    with sqlite3.connect(path) as other:
+        other.execute("UPDATE event_summary SET sports = 999 WHERE host_number = 1 AND year = 2000")
+
+    # The y values are base64 encoded in the HTML, so the charts are compared rather than searched for the new value
+    new_chart = figures_sqlite3.line_chart("sports", db)
+    assert new_chart is not chart
+    assert new_chart["fig"] != chart["fig"]
+
+
+def test_line_chart_cached_for_each_database(db, tmp_path):
+    """
+    GIVEN line charts created from two database files
+    WHEN the chart for the same feature is asked for from each
+    THEN each should be created from and cached for its own database
+    """
+    other = make_db(str(tmp_path.joinpath("other.db")))
+    other.execute("UPDATE event_summary SET sports = 999 WHERE host_number = 1 AND year = 2000")
+    other.commit()
+
+    chart = figures_sqlite3.line_chart("sports", db)
+    other_chart = figures_sqlite3.line_chart("sports", other)
+    other.close()
+
+    assert other_chart["fig"] != chart["fig"]
+    assert len(figures_sqlite3.line_chart_cache) == 2
@@ -0,0 +1,50 @@
+"""
+Tests of the query plan audit in student.placeholder.query_audit.
+"""
+import contextlib
+import io
+
+from student.placeholder import query_audit
+
+
+def test_collector_keeps_each_query_that_reads_rows():
+    """
+    GIVEN a connection that adds its queries to a QueryCollector
+    WHEN a table is created, rows are inserted and the same query is made with different values
+    THEN only the query that reads rows should be audited, once, and as a lookup rather than a read of every row
+    """
+    collector = query_audit.QueryCollector()
+    connection = query_audit.tracing_connection(collector)
+    connection.execute("CREATE TABLE host (host_id INTEGER PRIMARY KEY, host TEXT)")
+    connection.executemany("INSERT INTO host (host) VALUES (?)", [("Sydney",), ("Tokyo",)])
+    connection.execute("SELECT host_id FROM host WHERE host = ?", ("Sydney",)).fetchone()
+    connection.execute("SELECT host_id FROM host WHERE host = ?", ("Tokyo",)).fetchall()
+    connection.close()
+
+    assert collector.audited_queries() == [("SELECT host_id FROM host WHERE host = ?",
+                                            "SELECT host_id FROM host WHERE host = ?", False)]
+
+
+def test_flagged_steps():
+    """
+    GIVEN query plans that scan tables
+    WHEN the steps are checked
+    THEN a scan of the first table of a query that reads every row and a scan of a subquery should not be flagged,
+    and any other scan or automatic index should be
+    """
+    window_plan = ["CO-ROUTINE (subquery-2)", "SCAN host_event", "SEARCH host USING INTEGER PRIMARY KEY (rowid=?)",
+                   "SCAN (subquery-2)"]
+    assert query_audit.flagged_steps(window_plan, True) == []
+    assert query_audit.flagged_steps(window_plan, False) == ["SCAN host_event"]
+    join_plan = ["SCAN event", "SCAN host", "SEARCH x USING AUTOMATIC COVERING INDEX (id=?)"]
+    assert query_audit.flagged_steps(join_plan, True) == ["SCAN host", "SEARCH x USING AUTOMATIC COVERING INDEX (id=?)"]
+
+
+def test_database_queries_use_indexes():
+    """
+    GIVEN the queries made by the sqlite3 loaders, sync_data and the line chart
+    WHEN they are audited
+    THEN none should be flagged
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert query_audit.audit_database_queries() == []
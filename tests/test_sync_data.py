@@ -0,0 +1,101 @@
+"""
+Tests that student.placeholder.sync_data applies only the changes in paralympics.xlsx to a database made by create_db.
+"""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from student.placeholder import sync_data
+from student.placeholder.create_db import create_db
+from student.placeholder import figures_sqlite3
+
+TABLES = ['country', 'event', 'participants', 'host', 'host_event', 'disability', 'disability_event', 'medal_result']
+
+
+@pytest.fixture(scope="module")
+def source_sheets():
+    """The sheets of paralympics.xlsx that sync_all_data reads."""
+    return sync_data.read_sheets(['events', 'medal_standings', 'npc_codes'])
+
+
+@pytest.fixture
+def synced_db(tmp_path):
+    """A database file made by create_db and then synced once, so that it has the hash of every row."""
+    connection = sqlite3.connect(tmp_path.joinpath('paralympics.db'))
+    cursor = connection.cursor()
+    create_db(cursor, connection)
+    assert sync_data.sync_all_data(cursor, connection)
+    yield connection
+    connection.close()
+
+
+def changed_counts(summary):
+    """Return {table: (inserted, updated, deleted)} for the tables with changes."""
+    return {table: counts[:3] for table, counts in summary.items() if any(counts[:3])}
+
+
+def test_sync_unchanged_data(synced_db, capsys):
+    """
+    GIVEN a database that has been synced with paralympics.xlsx
+    WHEN it is synced again with the same data
+    THEN no rows should be inserted, updated or deleted, and event_summary should not be rebuilt
+    """
+    capsys.readouterr()
+    summary = sync_data.sync_all_data(synced_db.cursor(), synced_db)
+    assert list(summary) == TABLES
+    assert changed_counts(summary) == {}
+    assert 'Rebuilt event_summary' not in capsys.readouterr().out
+
+
+def test_sync_edited_removed_and_added_rows(synced_db, source_sheets, monkeypatch, capsys):
+    """
+    GIVEN a database that has been synced with paralympics.xlsx
+    WHEN an event is edited, a medal standing is removed and an NPC is added to the data, and it is synced again
+    THEN exactly those rows should be updated, deleted and inserted, event_summary should be rebuilt with the edited
+    event, and a line chart made before the sync should be made again from the new data
+    """
+    sheets = {name: df.copy() for name, df in source_sheets.items()}
+    events = sheets['events']
+    events.loc[0, 'countries'] = events.loc[0, 'countries'] + 1
+    sheets['medal_standings'] = sheets['medal_standings'].iloc[1:]
+    new_npc = pd.DataFrame({'code': ['XYZ'], 'name': ['New NPC']})
+    sheets['npc_codes'] = pd.concat([sheets['npc_codes'], new_npc], ignore_index=True)
+    monkeypatch.setattr(sync_data, 'read_sheets', lambda sheet_names: sheets)
+    monkeypatch.setattr(figures_sqlite3, 'line_chart_cache', {})
+    chart = figures_sqlite3.line_chart('countries', synced_db)
+    capsys.readouterr()
+
+    summary = sync_data.sync_all_data(synced_db.cursor(), synced_db)
+
+    assert changed_counts(summary) == {
+        'country': (1, 0, 0),
+        'event': (0, 1, 0),
+        'medal_result': (0, 0, 1),
+    }
+    assert 'Rebuilt event_summary' in capsys.readouterr().out
+    countries = synced_db.execute('SELECT DISTINCT countries FROM event_summary WHERE year = ? AND type = ?',
+                                  (int(events.loc[0, 'year']), events.loc[0, 'type'])).fetchall()
+    assert countries == [(events.loc[0, 'countries'],)]
+    new_chart = figures_sqlite3.line_chart('countries', synced_db)
+    assert new_chart is not chart
+    assert new_chart['fig'] != chart['fig']
+
+
+def test_sync_host_in_unknown_country(synced_db, source_sheets, monkeypatch):
+    """
+    GIVEN a database that has been synced with paralympics.xlsx
+    WHEN an event is edited to add a host in a country that is not in the npc codes, and it is synced again
+    THEN the sync should succeed without adding the host or a host_event row for it
+    """
+    sheets = {name: df.copy() for name, df in source_sheets.items()}
+    events = sheets['events']
+    events.loc[0, 'host'] = events.loc[0, 'host'] + ', Atlantis'
+    events.loc[0, 'country'] = events.loc[0, 'country'] + ', Not a country'
+    monkeypatch.setattr(sync_data, 'read_sheets', lambda sheet_names: sheets)
+
+    summary = sync_data.sync_all_data(synced_db.cursor(), synced_db)
+
+    assert changed_counts(summary) == {}
+    assert synced_db.execute("SELECT COUNT(*) FROM host WHERE host = 'Atlantis'").fetchone() == (0,)
+    assert not synced_db.in_transaction
@@ -0,0 +1,47 @@
+"""
+Tests that tutor.data.versioned_file only loads a file again when its contents change.
+"""
+import os
+
+from tutor.data.versioned_file import VersionedFile
+
+
+def test_versioned_file_loads_again_when_contents_change(tmp_path):
+    """
+    GIVEN a VersionedFile of a file that has been loaded
+    WHEN the file is written with new contents
+    THEN the next get should load the new contents and change the version
+    """
+    path = tmp_path.joinpath("data.txt")
+    path.write_text("first")
+    loads = []
+    versioned_file = VersionedFile(path, lambda p: loads.append(p) or open(p).read())
+    assert versioned_file.get() == "first"
+    version = versioned_file.version
+
+    path.write_text("second version")
+
+    assert versioned_file.get() == "second version"
+    assert versioned_file.version != version
+    assert len(loads) == 2
+
+
+def test_versioned_file_not_loaded_again_when_touched(tmp_path):
+    """
+    GIVEN a VersionedFile of a file that has been loaded
+    WHEN the file's modified time changes but its contents do not
+    THEN the next get should return the loaded value without loading the file again
+    """
+    path = tmp_path.joinpath("data.txt")
+    path.write_text("first")
+    loads = []
+    versioned_file = VersionedFile(path, lambda p: loads.append(p) or open(p).read())
+    versioned_file.get()
+    version = versioned_file.version
+
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+    assert versioned_file.get() == "first"
+    assert versioned_file.version == version
+    assert len(loads) == 1